@@ -10,9 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import date, timedelta
+from importlib.util import find_spec
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,11 +45,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'coreapp',  
 ]
 
 MIDDLEWARE = [
+    # First, so latency covers every other middleware
+    'coreapp.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -78,11 +85,72 @@ WSGI_APPLICATION = 'Checkinapp.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# DATABASE_PROFILE picks one of:
+#   sqlite      SQLite with Django's defaults (development)
+#   sqlite-wal  SQLite tuned for concurrent check-ins: WAL journal so readers
+#               never block the writer, synchronous=NORMAL, a busy timeout so
+#               writers wait for the lock instead of failing, memory-mapped
+#               reads, and persistent connections
+#   postgres    PostgreSQL configured from the POSTGRES_* variables, with
+#               persistent connections (requires psycopg)
+
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite')
+
+DATABASE_PROFILES = {
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'sqlite-wal': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+            ),
+            # Seconds to wait for the write lock
+            'timeout': 20,
+            # Take the write lock when a transaction starts, so two
+            # transactions never deadlock upgrading from a read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'checkinapp'),
+        'USER': os.environ.get('POSTGRES_USER', 'checkinapp'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(
+        f'Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}; expected one of: {", ".join(DATABASE_PROFILES)}'
+    )
 
 DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Holds the presence registry and the location grid version. Use a shared
+# backend such as Redis or Memcached when running more than one worker; until
+# then the active check-in endpoints read the database.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -141,13 +209,71 @@ AUTH_USER_MODEL = 'coreapp.Employee'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'coreapp.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON; MessagePack for `Accept: application/msgpack` when
+    # the optional msgpack package is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'coreapp.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'coreapp.renderers.MessagePackRenderer')
+
+# Mobile API tokens expire after this long without use; cached lookups are
+# rechecked against the database every TOKEN_CACHE_TIMEOUT seconds
+TOKEN_EXPIRY = timedelta(days=30)
+TOKEN_REFRESH_INTERVAL = timedelta(hours=1)
+TOKEN_CACHE_TIMEOUT = 60
+TOKEN_CACHE_SIZE = 10000
+
+# Logins check passwords in this many worker processes (0 checks them on the
+# request thread). Once LOGIN_QUEUE_LIMIT logins are waiting, further ones get
+# HTTP 429 with Retry-After: LOGIN_RETRY_AFTER seconds.
+LOGIN_POOL_WORKERS = 2
+LOGIN_QUEUE_LIMIT = 32
+LOGIN_RETRY_AFTER = 5
+LOGIN_TIMEOUT = 10
+
+# Seconds to remember Idempotency-Key headers on check-in and check-out
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Deletions are remembered this long for /api/mobile/admin/sync/; clients with
+# an older cursor get a full snapshot instead of changes
+SYNC_TOMBSTONE_RETENTION = timedelta(days=30)
+
+# Delivers live check-in events to /api/mobile/admin/live/ subscribers. The
+# in-process default only reaches subscribers in the same worker; with several
+# workers use 'coreapp.live.CacheBroadcast' and a shared CACHES backend.
+LIVE_EVENTS_BACKEND = 'coreapp.live.InProcessBroadcast'
+
+# Timesheet reports: hours after which worked time counts as overtime, per
+# day and per period (None for no limit), and the pay period cycle
+TIMESHEET_OVERTIME_HOURS = {'day': 8, 'week': 40, 'month': None, 'pay_period': 80}
+PAY_PERIOD_START = date(2024, 1, 1)
+PAY_PERIOD_DAYS = 14
+# How long reports for finished periods stay cached, in seconds
+TIMESHEET_CACHE_TIMEOUT = 24 * 60 * 60
+
+# archive_checkins moves closed check-ins older than this into CheckInArchive
+CHECKIN_ARCHIVE_AFTER = timedelta(days=90)
+
+# /metrics is staff-only unless the scraper's address (REMOTE_ADDR) is listed
+# here, e.g. METRICS_ALLOWED_IPS=127.0.0.1. Behind a reverse proxy every
+# request comes from the proxy's address, so only list addresses that reach
+# Django directly.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
+# Serve check-in, check-out, active check-in, locations and history from the
+# native async views in coreapp/async_api_views.py. Only worthwhile when the
+# project runs under an ASGI server (Checkinapp/asgi.py).
+ASYNC_MOBILE_API = os.environ.get('ASYNC_MOBILE_API', '') == '1'
+
 # CORS settings for mobile app
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8081",  # Expo development server
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Employee, Location, CheckIn
+from .models import Employee, Location, CheckIn, CheckInArchive, DailyLocationStats
+from . import presence
 
 class EmployeeAdmin(UserAdmin):
     list_display = ('email', 'full_name', 'employee_id', 'phone_number', 'is_staff')
@@ -32,7 +33,31 @@ class CheckInAdmin(admin.ModelAdmin):
     search_fields = ('employee__full_name', 'employee__email', 'location__name')
     list_filter = ('status', 'location')
     date_hierarchy = 'check_in_time'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        presence.invalidate()
+
+class CheckInArchiveAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'location', 'check_in_time', 'check_out_time', 'duration')
+    search_fields = ('employee__full_name', 'employee__email', 'location__name')
+    list_filter = ('location',)
+    date_hierarchy = 'check_in_time'
+    
+    # Archived rows are written by the archive_checkins command only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class DailyLocationStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'location', 'checkin_count', 'checkout_count', 'total_seconds', 'peak_occupancy')
+    list_filter = ('location',)
+    date_hierarchy = 'date'
 
 admin.site.register(Employee, EmployeeAdmin)
 admin.site.register(Location, LocationAdmin)
 admin.site.register(CheckIn, CheckInAdmin)
+admin.site.register(CheckInArchive, CheckInArchiveAdmin)
+admin.site.register(DailyLocationStats, DailyLocationStatsAdmin)
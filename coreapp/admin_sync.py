@@ -0,0 +1,151 @@
+"""
+Delta sync for the mobile admin dashboard.
+
+A cursor is the server time, in microseconds, at which a sync started. The
+next sync returns the employees, locations and check-ins whose updated_at is
+later than the cursor minus SAFETY_WINDOW, and the DeletedRecord tombstones
+from the same range. The window covers writes that had not committed yet when
+the previous sync ran, since updated_at is set before commit; rows inside it
+can be sent twice, so clients merge by primary key. Clients apply deletions
+before upserts, which is right whichever of the two happened last.
+
+Without a cursor, with one older than SYNC_TOMBSTONE_RETENTION, or when more
+than MAX_CHECKIN_CHANGES check-ins changed, the response is a full snapshot
+(`full: true`) that replaces everything the client holds.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CheckIn, DeletedRecord, Employee, Location
+from .serializers import CheckInReadSerializer, EmployeeReadSerializer, LocationReadSerializer
+from . import daily_stats, presence
+
+SAFETY_WINDOW = timedelta(seconds=5)
+
+# Sections of a snapshot that callers can skip
+SECTIONS = ('stats', 'checkins', 'employees', 'locations')
+
+# Check-ins the dashboard shows; a full snapshot sends the latest ones
+RECENT_CHECKINS = 50
+MAX_CHECKIN_CHANGES = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def tombstone_retention():
+    return getattr(settings, 'SYNC_TOMBSTONE_RETENTION', timedelta(days=30))
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(cursor):
+    try:
+        return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise InvalidCursor(cursor)
+
+
+def dashboard_stats(employees=None, locations=None):
+    """
+    The dashboard counters. Callers that already loaded the non-staff
+    employees or all locations pass them in to save the count queries.
+    """
+    return {
+        # Currently checked in employees count
+        'currently_checked_in': presence.checked_in_count(),
+        # Today's check-ins count, from the daily rollup
+        'todays_checkins': daily_stats.totals_for(timezone.localdate())['checkins'],
+        'total_employees': (
+            len(employees) if employees is not None
+            else Employee.objects.filter(is_staff=False).count()
+        ),
+        'total_locations': (
+            sum(1 for location in locations if location.is_active) if locations is not None
+            else Location.objects.filter(is_active=True).count()
+        ),
+    }
+
+
+def _checkins():
+    return CheckIn.objects.select_related('employee', 'location').order_by('-check_in_time')
+
+
+def snapshot(skip=()):
+    """Everything the dashboard shows, except the sections named in skip"""
+    data = {'full': True}
+    employees = locations = None
+    if 'employees' not in skip:
+        employees = list(Employee.objects.filter(is_staff=False))
+        data['employees'] = EmployeeReadSerializer(employees, many=True).data
+    if 'locations' not in skip:
+        locations = list(Location.objects.all())
+        data['locations'] = LocationReadSerializer(locations, many=True).data
+    if 'checkins' not in skip:
+        data['checkins'] = CheckInReadSerializer(_checkins()[:RECENT_CHECKINS], many=True).data
+    if 'stats' not in skip:
+        data['stats'] = dashboard_stats(employees, locations)
+    data['deleted'] = {'checkins': [], 'employees': [], 'locations': []}
+    return data
+
+
+def changes(after):
+    """Rows changed or deleted after the given time, or None when a snapshot is smaller"""
+    checkins = list(_checkins().filter(updated_at__gt=after)[:MAX_CHECKIN_CHANGES + 1])
+    if len(checkins) > MAX_CHECKIN_CHANGES:
+        return None
+
+    deleted = {'checkins': [], 'employees': [], 'locations': []}
+    for model, object_id in DeletedRecord.objects.filter(deleted_at__gt=after).values_list('model', 'object_id'):
+        if model == 'employee':
+            deleted['employees'].append(object_id)
+        else:
+            deleted[f'{model}s'].append(int(object_id))
+
+    employees = []
+    for employee in Employee.objects.filter(updated_at__gt=after):
+        # Employees promoted to staff leave the employee list
+        if employee.is_staff:
+            deleted['employees'].append(employee.pk)
+        else:
+            employees.append(employee)
+
+    return {
+        'full': False,
+        'stats': dashboard_stats(),
+        'checkins': CheckInReadSerializer(checkins, many=True).data,
+        'employees': EmployeeReadSerializer(employees, many=True).data,
+        'locations': LocationReadSerializer(Location.objects.filter(updated_at__gt=after), many=True).data,
+        'deleted': deleted,
+    }
+
+
+def bootstrap(skip=()):
+    """
+    A snapshot for the dashboard's first load. Only a complete one carries a
+    cursor, since later syncs would not fill in the skipped sections.
+    """
+    now = timezone.now()
+    data = snapshot(skip)
+    if not skip:
+        data['cursor'] = encode_cursor(now)
+    return data
+
+
+def sync(cursor=None):
+    """Changes since the cursor (or a snapshot), with the cursor for the next sync"""
+    now = timezone.now()
+    data = None
+    if cursor:
+        since = decode_cursor(cursor)
+        if since >= now - tombstone_retention():
+            data = changes(since - SAFETY_WINDOW)
+    if data is None:
+        data = snapshot()
+    data['cursor'] = encode_cursor(now)
+    return data
@@ -2,15 +2,24 @@ from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from .models import Employee, Location, CheckIn
 from .serializers import (
-    EmployeeSerializer, LocationSerializer, CheckInSerializer,
-    CheckInCreateSerializer, CheckOutSerializer
+    EmployeeSerializer, CheckInSerializer,
+    CheckInCreateSerializer, CheckOutSerializer, NearbyLocationsSerializer,
+    CheckInBatchSerializer, CheckInReadSerializer, EmployeeReadSerializer,
+    LocationReadSerializer
 )
+from .authentication import issue_token, revoke_tokens
+from .checkin_batch import sync_checkin_events
+from .conditional import list_validators, not_modified, representation, set_validators
+from .fieldsets import parse_fieldset, restrict_queryset
+from .geo import get_location_grid
+from .idempotency import idempotent
+from .login_pool import LoginQueueFull, authenticate_login
+from .pagination import HISTORY_PAGE_SIZE, paginate_checkins, parse_page_size
+from . import admin_sync, presence, services, timesheets
 
 @api_view(['POST'])
 @permission_classes([])
@@ -24,10 +33,15 @@ def api_login(request):
             'error': 'Email and password are required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    user = authenticate(email=email, password=password)
+    try:
+        user = authenticate_login(email, password)
+    except LoginQueueFull as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(e.retry_after)})
     
     if user:
-        token, created = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'token': token.key,
             'user': EmployeeSerializer(user).data,
@@ -42,7 +56,7 @@ def api_login(request):
 def api_logout(request):
     """API endpoint for mobile app logout"""
     try:
-        request.user.auth_token.delete()
+        revoke_tokens(request.user)
         return Response({'message': 'Successfully logged out'})
     except:
         return Response({'message': 'Logged out'})
@@ -54,33 +68,98 @@ def api_profile(request):
 
 @api_view(['GET'])
 def api_locations(request):
-    """Get all active locations"""
+    """Get all active locations; ?fields= or ?exclude= pick the fields"""
+    try:
+        fields = parse_fieldset(request.query_params, LocationReadSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
     locations = Location.objects.filter(is_active=True)
-    return Response(LocationSerializer(locations, many=True).data)
+    
+    validators = list_validators(locations, representation(fields, request.accepted_media_type))
+    unchanged = not_modified(request, *validators)
+    if unchanged:
+        return unchanged
+    
+    locations = restrict_queryset(locations, LocationReadSerializer, fields)
+    return set_validators(Response(LocationReadSerializer(locations, many=True, fields=fields).data), *validators)
+
+def _skipped_sections(request, sections):
+    """The sections named in ?skip=a,b, or None if any of them is unknown"""
+    skip = {name for name in request.query_params.get('skip', '').split(',') if name}
+    return skip if skip <= set(sections) else None
+
+# Sections of the employee dashboard bootstrap
+EMPLOYEE_SECTIONS = ('profile', 'locations', 'active_checkin')
+
+@api_view(['GET'])
+def api_bootstrap(request):
+    """Get everything the employee dashboard shows in one response"""
+    skip = _skipped_sections(request, EMPLOYEE_SECTIONS)
+    if skip is None:
+        return Response({
+            'error': f'skip takes a comma-separated list of: {", ".join(EMPLOYEE_SECTIONS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = {}
+    if 'profile' not in skip:
+        data['profile'] = EmployeeSerializer(request.user).data
+    if 'locations' not in skip:
+        data['locations'] = LocationReadSerializer(Location.objects.filter(is_active=True), many=True).data
+    if 'active_checkin' not in skip:
+        # From the presence registry, usually without a query
+        data['active_checkin'] = presence.active_checkin_for(request.user.pk)
+    return Response(data)
+
+@api_view(['GET'])
+def api_nearby_locations(request):
+    """Get the nearest active locations to a coordinate, with distances"""
+    serializer = NearbyLocationsSerializer(data=request.query_params)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    params = serializer.validated_data
+    nearest = get_location_grid().nearest(
+        params['latitude'], params['longitude'], params['k'], params.get('radius')
+    )
+    return Response([
+        {**location, 'distance_meters': round(distance, 1)}
+        for distance, location in nearest
+    ])
 
 @api_view(['GET'])
 def api_active_checkin(request):
     """Get user's active check-in if any"""
-    active_checkin = CheckIn.objects.filter(
-        employee=request.user,
-        status='checked_in',
-        check_out_time__isnull=True
-    ).first()
+    active_checkin = presence.active_checkin_for(request.user.pk)
     
     if active_checkin:
-        return Response(CheckInSerializer(active_checkin).data)
+        return Response(active_checkin)
     else:
         return Response({'active_checkin': None})
 
 @api_view(['GET'])
 def api_checkin_history(request):
-    """Get user's check-in history"""
+    """Get one page of the user's check-in history, newest first; ?fields= or ?exclude= pick the fields"""
     checkins = CheckIn.objects.filter(
         employee=request.user
-    ).order_by('-check_in_time')[:20]
+    ).select_related('employee', 'location')
+    
+    try:
+        fields = parse_fieldset(request.query_params, CheckInReadSerializer)
+        # The next page cursor is built from check_in_time
+        checkins = restrict_queryset(checkins, CheckInReadSerializer, fields, required=['check_in_time'])
+        page_size = parse_page_size(request.query_params.get('page_size'), default=HISTORY_PAGE_SIZE)
+        records, next_cursor = paginate_checkins(checkins, request.query_params.get('cursor'), page_size)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(CheckInSerializer(checkins, many=True).data)
+    return Response({
+        'results': CheckInReadSerializer(records, many=True, fields=fields).data,
+        'next_cursor': next_cursor
+    })
 
+@idempotent
 @api_view(['POST'])
 def api_checkin(request):
     """Check in to a location"""
@@ -96,18 +175,6 @@ def api_checkin(request):
     try:
         location = get_object_or_404(Location, id=location_id)
         
-        # Check if employee is already checked in somewhere
-        active_checkin = CheckIn.objects.filter(
-            employee=request.user,
-            status='checked_in',
-            check_out_time__isnull=True
-        ).first()
-        
-        if active_checkin:
-            return Response({
-                'error': 'You are already checked in at another location. Please check out first.'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         # Check if employee can check in (15 minutes before shift start)
         current_time = timezone.localtime().time()
         if not location.can_check_in(current_time):
@@ -121,24 +188,24 @@ def api_checkin(request):
                 'error': f'You are not within range of this location. Please move closer to {location.name}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create check-in record
-        checkin = CheckIn.objects.create(
-            employee=request.user,
-            location=location,
-            check_in_time=timezone.now(),
-            status='checked_in'
-        )
+        # Fails if the employee is already checked in somewhere
+        checkin = services.check_in(request.user, location)
         
         return Response({
             'message': f'Successfully checked in at {location.name}',
             'checkin': CheckInSerializer(checkin).data
         })
         
+    except services.CheckInError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@idempotent
 @api_view(['POST'])
 def api_checkout(request):
     """Check out from current location"""
@@ -152,15 +219,11 @@ def api_checkout(request):
     
     try:
         # Find active check-in for this employee
-        active_checkin = CheckIn.objects.filter(
-            employee=request.user,
-            status='checked_in',
-            check_out_time__isnull=True
-        ).first()
+        active_checkin = services.open_checkin(request.user)
         
         if not active_checkin:
             return Response({
-                'error': 'You are not currently checked in anywhere'
+                'error': services.NOT_CHECKED_IN
             }, status=status.HTTP_400_BAD_REQUEST)
         
         location = active_checkin.location
@@ -169,21 +232,34 @@ def api_checkout(request):
                 'error': f'You are not within range of this location. Please move closer to {location.name} to check out'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update check-in record
-        active_checkin.check_out_time = timezone.now()
-        active_checkin.status = 'checked_out'
-        active_checkin.save()
+        # Fails if another request checked out first
+        services.check_out(active_checkin)
         
         return Response({
-            'message': f'Successfully checked out from {active_checkin.location.name}',
+            'message': f'Successfully checked out from {location.name}',
             'checkin': CheckInSerializer(active_checkin).data
         })
         
+    except services.CheckInError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+def api_sync_checkins(request):
+    """Apply check-in and check-out events queued by the app while offline"""
+    serializer = CheckInBatchSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    results = sync_checkin_events(request.user, serializer.validated_data['events'])
+    return Response({'results': results})
+
 # Admin API endpoints
 @api_view(['GET'])
 def api_admin_dashboard_stats(request):
@@ -191,55 +267,90 @@ def api_admin_dashboard_stats(request):
     if not request.user.is_staff:
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    today = timezone.now().date()
+    return Response(admin_sync.dashboard_stats())
+
+@api_view(['GET'])
+def api_admin_all_checkins(request):
+    """Get the latest check-in records for admin; ?fields= or ?exclude= pick the fields"""
+    if not request.user.is_staff:
+        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        fields = parse_fieldset(request.query_params, CheckInReadSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    checkins = CheckIn.objects.all().select_related('employee', 'location').order_by('-check_in_time')
+    checkins = restrict_queryset(checkins, CheckInReadSerializer, fields)[:50]
+    return Response(CheckInReadSerializer(checkins, many=True, fields=fields).data)
+
+@api_view(['GET'])
+def api_admin_employees(request):
+    """Get all employees for admin; ?fields= or ?exclude= pick the fields"""
+    if not request.user.is_staff:
+        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        fields = parse_fieldset(request.query_params, EmployeeReadSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Currently checked in employees count
-    currently_checked_in = CheckIn.objects.filter(
-        status='checked_in',
-        check_out_time__isnull=True
-    ).count()
+    employees = restrict_queryset(Employee.objects.filter(is_staff=False), EmployeeReadSerializer, fields)
+    return Response(EmployeeReadSerializer(employees, many=True, fields=fields).data)
+
+@api_view(['GET'])
+def api_admin_locations(request):
+    """Get all locations for admin; ?fields= or ?exclude= pick the fields"""
+    if not request.user.is_staff:
+        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Today's check-ins count
-    todays_checkins = CheckIn.objects.filter(
-        check_in_time__date=today
-    ).count()
+    try:
+        fields = parse_fieldset(request.query_params, LocationReadSerializer)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Total employees
-    total_employees = Employee.objects.filter(is_staff=False).count()
+    locations = Location.objects.all()
     
-    # Total locations
-    total_locations = Location.objects.filter(is_active=True).count()
+    validators = list_validators(locations, representation(fields, request.accepted_media_type))
+    unchanged = not_modified(request, *validators)
+    if unchanged:
+        return unchanged
     
-    return Response({
-        'currently_checked_in': currently_checked_in,
-        'todays_checkins': todays_checkins,
-        'total_employees': total_employees,
-        'total_locations': total_locations
-    })
+    locations = restrict_queryset(locations, LocationReadSerializer, fields)
+    return set_validators(Response(LocationReadSerializer(locations, many=True, fields=fields).data), *validators)
 
 @api_view(['GET'])
-def api_admin_all_checkins(request):
-    """Get all check-in records for admin"""
+def api_admin_bootstrap(request):
+    """Get everything the admin dashboard shows in one response"""
     if not request.user.is_staff:
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    checkins = CheckIn.objects.all().select_related('employee', 'location').order_by('-check_in_time')[:50]
-    return Response(CheckInSerializer(checkins, many=True).data)
+    skip = _skipped_sections(request, admin_sync.SECTIONS)
+    if skip is None:
+        return Response({
+            'error': f'skip takes a comma-separated list of: {", ".join(admin_sync.SECTIONS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(admin_sync.bootstrap(skip))
 
 @api_view(['GET'])
-def api_admin_employees(request):
-    """Get all employees for admin"""
+def api_admin_sync(request):
+    """Get admin dashboard rows changed since the `since` cursor, or all of them"""
     if not request.user.is_staff:
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    employees = Employee.objects.filter(is_staff=False)
-    return Response(EmployeeSerializer(employees, many=True).data)
+    try:
+        return Response(admin_sync.sync(request.query_params.get('since')))
+    except admin_sync.InvalidCursor:
+        return Response({'error': 'Invalid sync cursor'}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
-def api_admin_locations(request):
-    """Get all locations for admin"""
+def api_admin_timesheets(request):
+    """Get worked and overtime hours per employee, location and period"""
     if not request.user.is_staff:
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    locations = Location.objects.all()
-    return Response(LocationSerializer(locations, many=True).data)
\ No newline at end of file
+    try:
+        return Response(timesheets.build_report(**timesheets.parse_report_params(request.query_params)))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
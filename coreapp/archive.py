@@ -0,0 +1,79 @@
+"""
+Hot/cold storage for check-ins. The archive_checkins command moves closed
+check-ins older than CHECKIN_ARCHIVE_AFTER from CheckIn into CheckInArchive,
+so the dashboards, the admin changelist and the mobile lists only scan recent
+rows. The daily rollup keeps its totals, and reports that need older data
+read both tables through combined().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import CheckIn, CheckInArchive
+
+# The columns an archived row keeps
+ARCHIVED_FIELDS = ('id', 'employee_id', 'location_id', 'check_in_time', 'check_out_time', 'status', 'duration')
+
+BATCH_SIZE = 1000
+
+_moving = ContextVar('archive_moving', default=False)
+
+
+@contextmanager
+def moving():
+    """Mark CheckIn deletions in this block as moves into the archive"""
+    token = _moving.set(True)
+    try:
+        yield
+    finally:
+        _moving.reset(token)
+
+
+def is_moving():
+    """True while archive_batch deletes the rows it has copied"""
+    return _moving.get()
+
+
+def archive_after():
+    return getattr(settings, 'CHECKIN_ARCHIVE_AFTER', timedelta(days=90))
+
+
+def archive_batch(before, batch_size=BATCH_SIZE):
+    """
+    Move up to batch_size of the oldest closed check-ins that started before
+    the given time, in one transaction. Returns how many were moved.
+    """
+    with transaction.atomic():
+        rows = list(
+            CheckIn.objects.select_for_update().filter(
+                check_in_time__lt=before,
+                check_out_time__isnull=False
+            ).order_by('check_in_time', 'id').values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        CheckInArchive.objects.bulk_create([CheckInArchive(**row) for row in rows])
+        # A move, not a deletion: the post_delete receivers check is_moving()
+        # so they write no sync tombstones and drop no caches for these rows
+        with moving():
+            CheckIn.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def combined(build):
+    """
+    One UNION ALL query over hot and archived check-ins. build is called with
+    a CheckIn queryset and then a CheckInArchive one, and must return values()
+    or values_list() querysets with the same columns, e.g.
+
+        combined(lambda checkins: checkins.filter(employee=employee).values_list('check_in_time', 'duration'))
+
+    Grouped querysets work too; a group can then appear once per table. The
+    result can be ordered by its columns, sliced and iterated.
+    """
+    hot = build(CheckIn.objects.all()).order_by()
+    archived = build(CheckInArchive.objects.all()).order_by()
+    return hot.union(archived, all=True)
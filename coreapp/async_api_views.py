@@ -0,0 +1,273 @@
+"""
+Native async versions of the busiest mobile API endpoints, for deployments
+served through Checkinapp/asgi.py. DRF 3.14 views are synchronous, so these
+are plain Django async views that repeat DRF's authentication, validation and
+JSON rendering (with the orjson renderer from renderers.py) to return the same responses as the views in api_views.py.
+urls.py routes to them when settings.ASYNC_MOBILE_API is on. The live event
+stream, api_admin_live, only exists here.
+
+Django cannot run async ORM calls inside transaction.atomic(), so the writes
+go through the synchronous functions in services.py, run in a thread.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.authentication import SessionAuthentication
+
+from .authentication import CachedTokenAuthentication
+from .conditional import alist_validators, not_modified, representation, set_validators
+from .fieldsets import parse_fieldset, restrict_queryset
+from .idempotency import idempotent
+from .models import Location, CheckIn
+from .pagination import HISTORY_PAGE_SIZE, apaginate_checkins, parse_page_size
+from .renderers import ORJSONRenderer
+from .serializers import (
+    CheckInSerializer, CheckInCreateSerializer, CheckOutSerializer, CheckInReadSerializer,
+    LocationReadSerializer
+)
+from . import live, presence, services
+
+
+def _response(data, status=status.HTTP_200_OK):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def _authenticate(request):
+    """
+    Authenticate like DRF's default classes (session, then token) and return
+    the user. Failures raise APIException; DRF reports them as 403 because the
+    first authentication class has no WWW-Authenticate header.
+    """
+    user = await request.auser()
+    if user.is_authenticated and user.is_active:
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            SessionAuthentication().enforce_csrf(request)
+        return user
+
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != 'token':
+        raise exceptions.NotAuthenticated()
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed('Invalid token header. No credentials provided.')
+    if len(auth) > 2:
+        raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+    user, _ = await CachedTokenAuthentication().aauthenticate_credentials(auth[1])
+    return user
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError as e:
+            raise exceptions.ParseError(f'JSON parse error - {e}')
+    return request.POST
+
+
+def async_api_view(methods):
+    """Async counterpart of @api_view for the default authentication and permission settings"""
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                request.user = await _authenticate(request)
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as e:
+                code = e.status_code
+                if isinstance(e, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    code = status.HTTP_403_FORBIDDEN
+                return _response({'detail': e.detail}, status=code)
+        return wrapper
+    return decorator
+
+
+@async_api_view(['GET'])
+async def api_locations(request):
+    """Get all active locations; ?fields= or ?exclude= pick the fields"""
+    try:
+        fields = parse_fieldset(request.GET, LocationReadSerializer)
+    except ValueError as e:
+        return _response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = Location.objects.filter(is_active=True)
+
+    validators = await alist_validators(queryset, representation(fields, 'application/json'))
+    unchanged = not_modified(request, *validators)
+    if unchanged:
+        return unchanged
+
+    queryset = restrict_queryset(queryset, LocationReadSerializer, fields)
+    locations = [location async for location in queryset]
+    return set_validators(_response(LocationReadSerializer(locations, many=True, fields=fields).data), *validators)
+
+
+@async_api_view(['GET'])
+async def api_active_checkin(request):
+    """Get user's active check-in if any"""
+    active_checkin = await presence.aactive_checkin_for(request.user.pk)
+
+    if active_checkin:
+        return _response(active_checkin)
+    else:
+        return _response({'active_checkin': None})
+
+
+@async_api_view(['GET'])
+async def api_checkin_history(request):
+    """Get one page of the user's check-in history, newest first; ?fields= or ?exclude= pick the fields"""
+    checkins = CheckIn.objects.filter(
+        employee=request.user
+    ).select_related('employee', 'location')
+
+    try:
+        fields = parse_fieldset(request.GET, CheckInReadSerializer)
+        # The next page cursor is built from check_in_time
+        checkins = restrict_queryset(checkins, CheckInReadSerializer, fields, required=['check_in_time'])
+        page_size = parse_page_size(request.GET.get('page_size'), default=HISTORY_PAGE_SIZE)
+        records, next_cursor = await apaginate_checkins(checkins, request.GET.get('cursor'), page_size)
+    except ValueError as e:
+        return _response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return _response({
+        'results': CheckInReadSerializer(records, many=True, fields=fields).data,
+        'next_cursor': next_cursor
+    })
+
+
+@idempotent
+@async_api_view(['POST'])
+async def api_checkin(request):
+    """Check in to a location"""
+    serializer = CheckInCreateSerializer(data=_request_data(request))
+
+    if not serializer.is_valid():
+        return _response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    location_id = serializer.validated_data['location_id']
+    user_latitude = serializer.validated_data['latitude']
+    user_longitude = serializer.validated_data['longitude']
+
+    try:
+        location = await aget_object_or_404(Location, id=location_id)
+
+        # Check if employee can check in (15 minutes before shift start)
+        current_time = timezone.localtime().time()
+        if not location.can_check_in(current_time):
+            return _response({
+                'error': f'You can only check in 15 minutes before your shift starts at {location.start_time.strftime("%H:%M")}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Check if employee is within range of the location
+        if not location.is_within_range(user_latitude, user_longitude):
+            return _response({
+                'error': f'You are not within range of this location. Please move closer to {location.name}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Fails if the employee is already checked in somewhere
+        checkin = await sync_to_async(services.check_in)(request.user, location)
+
+        return _response({
+            'message': f'Successfully checked in at {location.name}',
+            'checkin': CheckInSerializer(checkin).data
+        })
+
+    except services.CheckInError as e:
+        return _response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return _response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@idempotent
+@async_api_view(['POST'])
+async def api_checkout(request):
+    """Check out from current location"""
+    serializer = CheckOutSerializer(data=_request_data(request))
+
+    if not serializer.is_valid():
+        return _response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    user_latitude = serializer.validated_data['latitude']
+    user_longitude = serializer.validated_data['longitude']
+
+    try:
+        # Find active check-in for this employee
+        active_checkin = await CheckIn.objects.filter(
+            employee=request.user,
+            status='checked_in',
+            check_out_time__isnull=True
+        ).select_related('employee', 'location').afirst()
+
+        if not active_checkin:
+            return _response({
+                'error': services.NOT_CHECKED_IN
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        location = active_checkin.location
+        if not location.is_within_range(user_latitude, user_longitude):
+            return _response({
+                'error': f'You are not within range of this location. Please move closer to {location.name} to check out'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Fails if another request checked out first
+        await sync_to_async(services.check_out)(active_checkin)
+
+        return _response({
+            'message': f'Successfully checked out from {location.name}',
+            'checkin': CheckInSerializer(active_checkin).data
+        })
+
+    except services.CheckInError as e:
+        return _response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return _response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Seconds between keepalive comments, which also notice closed connections
+HEARTBEAT_INTERVAL = 15
+
+
+async def _live_events():
+    async with live.get_backend().subscribe() as subscription:
+        # Current counters first, so a (re)connecting client starts in sync
+        yield live.RETRY + live.encode('stats', await sync_to_async(live.stats)())
+        while True:
+            message = await subscription.get(HEARTBEAT_INTERVAL)
+            yield message if message is not None else live.KEEPALIVE
+
+
+@async_api_view(['GET'])
+async def api_admin_live(request):
+    """Stream check-in and check-out events with updated counters as Server-Sent Events"""
+    if not request.user.is_staff:
+        return _response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+
+    if isinstance(request, ASGIRequest):
+        events = _live_events()
+    else:
+        # A WSGI worker would be tied up for as long as the stream stays open,
+        # so send the counters and let the client reconnect after RETRY
+        events = [live.RETRY + live.encode('stats', await sync_to_async(live.stats)())]
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,185 @@
+"""
+Token authentication for the mobile API that skips the Token/Employee query
+for recently seen tokens, and expires tokens that have not been used for
+TOKEN_EXPIRY.
+
+Each worker keeps its own bounded LRU cache of token lookups. Revoking a
+user's tokens stores a revocation time for that user in Django's cache, and
+every worker drops that user's entries cached before it on their next lookup,
+so one logout leaves everyone else's cached tokens alone. With a per-process
+CACHES backend other workers notice within TOKEN_CACHE_TIMEOUT seconds instead.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_REVOKED_KEY = 'coreapp:token-revoked:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def token_expiry():
+    """How long a token stays valid after it was last used"""
+    return _setting('TOKEN_EXPIRY', timedelta(days=30))
+
+
+def token_refresh_interval():
+    """Minimum time between writes of a token's last-used time"""
+    return _setting('TOKEN_REFRESH_INTERVAL', timedelta(hours=1))
+
+
+class TokenCache:
+    """Thread-safe LRU mapping of token key to (user, last used, cached at)"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return (user, last used, cached at) for a token, or None; cached at is a time.time() value"""
+        timeout = _setting('TOKEN_CACHE_TIMEOUT', 60)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[2] > timeout:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, user, last_used, cached_at):
+        max_size = _setting('TOKEN_CACHE_SIZE', 10000)
+        with self.lock:
+            self.entries[key] = (user, last_used, cached_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry[0].pk == user_id]:
+                del self.entries[key]
+
+
+token_cache = TokenCache()
+
+
+def _is_expired(last_used, now):
+    return last_used < now - token_expiry()
+
+
+def issue_token(user):
+    """Return the user's token, replacing it first if it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and _is_expired(token.created, timezone.now()):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def revoke_tokens(user):
+    """Delete the user's tokens and drop them from every worker's cache"""
+    Token.objects.filter(user=user).delete()
+    cache.set(TOKEN_REVOKED_KEY.format(user.pk), time.time(), timeout=_setting('TOKEN_CACHE_TIMEOUT', 60) * 2)
+    token_cache.discard_user(user.pk)
+
+
+def _revoked(cached_at, revoked_at):
+    """Whether a cached lookup predates the revocation of the user's tokens"""
+    return revoked_at is not None and cached_at <= revoked_at
+
+
+EXPIRED = 'expired'
+REFRESH = 'refresh'
+
+
+def _check(key, user, last_used, now):
+    """Return EXPIRED, REFRESH or None for a token; raises if the user is inactive"""
+    if not user.is_active:
+        token_cache.discard(key)
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    if _is_expired(last_used, now):
+        token_cache.discard(key)
+        return EXPIRED
+    if now - last_used > token_refresh_interval():
+        return REFRESH
+    return None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication with a per-worker cache and a sliding expiry window.
+    Token.created holds the time the token was last used; it is refreshed at
+    most once per TOKEN_REFRESH_INTERVAL.
+    """
+
+    def authenticate_credentials(self, key):
+        now = timezone.now()
+        cached = token_cache.get(key)
+        if cached is not None and _revoked(cached[2], cache.get(TOKEN_REVOKED_KEY.format(cached[0].pk))):
+            token_cache.discard(key)
+            cached = None
+        if cached is not None:
+            user, last_used, cached_at = cached
+        else:
+            # Taken before the query, so a revocation racing it still wins
+            cached_at = time.time()
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            user, last_used = token.user, token.created
+
+        state = _check(key, user, last_used, now)
+        if state == EXPIRED:
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if state == REFRESH:
+            Token.objects.filter(key=key).update(created=now)
+            last_used = now
+
+        token_cache.set(key, user, last_used, cached_at)
+        return user, Token(key=key, user=user, created=last_used)
+
+    async def aauthenticate_credentials(self, key):
+        """authenticate_credentials() for async views"""
+        now = timezone.now()
+        cached = token_cache.get(key)
+        if cached is not None and _revoked(cached[2], await cache.aget(TOKEN_REVOKED_KEY.format(cached[0].pk))):
+            token_cache.discard(key)
+            cached = None
+        if cached is not None:
+            user, last_used, cached_at = cached
+        else:
+            cached_at = time.time()
+            try:
+                token = await Token.objects.select_related('user').aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            user, last_used = token.user, token.created
+
+        state = _check(key, user, last_used, now)
+        if state == EXPIRED:
+            await Token.objects.filter(key=key).adelete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if state == REFRESH:
+            await Token.objects.filter(key=key).aupdate(created=now)
+            last_used = now
+
+        token_cache.set(key, user, last_used, cached_at)
+        return user, Token(key=key, user=user, created=last_used)
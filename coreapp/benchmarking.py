@@ -0,0 +1,128 @@
+"""
+Helpers shared by the benchmark management commands: a throwaway database
+and synthetic employees, locations and check-ins to run against.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from .models import Employee, Location, CheckIn
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """
+    Create a freshly migrated test database for the default connection and
+    destroy it afterwards. SQLite databases are put in a temporary file rather
+    than in memory so timings include real I/O.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    temp_dir = None
+    if connection.vendor == 'sqlite':
+        temp_dir = tempfile.mkdtemp(prefix='checkinapp-bench-')
+        test_settings['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = old_test_name
+        if temp_dir:
+            for name in os.listdir(temp_dir):
+                os.remove(os.path.join(temp_dir, name))
+            os.rmdir(temp_dir)
+
+
+def seed_data(employees=200, locations=20, checkins=100000, days=180, seed=1):
+    """
+    Insert synthetic data with bulk_create. Every employee ends up with at most
+    one open check-in, as the app guarantees, and all of them share the password
+    BENCHMARK_PASSWORD.
+    """
+    rng = random.Random(seed)
+    password = make_password(BENCHMARK_PASSWORD)
+
+    Employee.objects.bulk_create([
+        Employee(
+            email=f'bench{i}@example.com',
+            full_name=f'Bench Employee {i}',
+            employee_id=f'BENCH{i:06d}',
+            password=password,
+        )
+        for i in range(employees)
+    ], batch_size=1000)
+    employee_ids = list(Employee.objects.filter(email__startswith='bench').values_list('pk', flat=True))
+
+    Location.objects.bulk_create([
+        Location(
+            name=f'Bench Site {i}',
+            address=f'{i} Benchmark Road',
+            start_time='00:15',
+            end_time='23:59',
+            range_meters=200,
+            latitude=Decimal('40.700000') + Decimal(i) / 1000,
+            longitude=Decimal('-74.000000') + Decimal(i) / 1000,
+        )
+        for i in range(locations)
+    ], batch_size=1000)
+    location_ids = list(Location.objects.filter(name__startswith='Bench Site').values_list('pk', flat=True))
+
+    now = timezone.now()
+    open_employees = set()
+    batch = []
+    for _ in range(checkins):
+        employee_id = rng.choice(employee_ids)
+        check_in_time = now - timedelta(seconds=rng.randint(0, days * 86400))
+        stay = timedelta(minutes=rng.randint(30, 600))
+        record = CheckIn(
+            employee_id=employee_id,
+            location_id=rng.choice(location_ids),
+            check_in_time=check_in_time,
+        )
+        # Roughly one in ten of today's check-ins is still open
+        if check_in_time > now - timedelta(hours=12) and employee_id not in open_employees and rng.random() < 0.1:
+            open_employees.add(employee_id)
+        else:
+            record.check_out_time = min(check_in_time + stay, now)
+            record.duration = record.check_out_time - check_in_time
+            record.status = 'checked_out'
+        batch.append(record)
+        if len(batch) >= 5000:
+            CheckIn.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        CheckIn.objects.bulk_create(batch)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    return employee_ids, location_ids
+
+
+def time_call(func, repeat=20):
+    """Run func repeat times and return timing statistics in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'min_ms': round(timings[0], 4),
+    }
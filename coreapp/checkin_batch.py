@@ -0,0 +1,241 @@
+"""
+Applies check-in and check-out events that the mobile app queued while it
+had no connection, using the same rules as api_checkin and api_checkout.
+
+Accepted client_ids are remembered per employee in Django's cache for
+MAX_EVENT_AGE, so an app that resends a batch after losing the response gets
+those events reported as accepted again instead of rejected as stale.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .geo import haversine_distances
+from .models import CheckIn, Location
+from . import daily_stats, live, presence, timesheets
+from .serializers import CheckInEventSerializer, CheckInSerializer
+
+# How far ahead of the server clock an event timestamp may be
+CLOCK_SKEW = timedelta(minutes=2)
+# Queued events older than this are refused
+MAX_EVENT_AGE = timedelta(days=7)
+
+ACCEPTED_KEY_PREFIX = 'coreapp:synced-event:'
+
+
+def _distance_table(events, locations):
+    """
+    Distances from every event to every candidate location, measured in one
+    vectorized pass. Returns {(event index, location id): meters}.
+    """
+    pairs = [
+        (index, location)
+        for index in range(len(events))
+        for location in locations
+        if location.latitude is not None and location.longitude is not None
+    ]
+    distances = haversine_distances(
+        [float(events[index]['latitude']) for index, _ in pairs],
+        [float(events[index]['longitude']) for index, _ in pairs],
+        [float(location.latitude) for _, location in pairs],
+        [float(location.longitude) for _, location in pairs],
+    )
+    return {
+        (index, location.id): distance
+        for (index, location), distance in zip(pairs, distances)
+    }
+
+
+def _accepted_key(employee, client_id):
+    digest = hashlib.sha256(str(client_id).encode()).hexdigest()
+    return f'{ACCEPTED_KEY_PREFIX}{employee.pk}:{digest}'
+
+
+def _remember_accepted(employee, events, accepted):
+    """Record the accepted client_ids once the transaction commits"""
+    remembered = {
+        _accepted_key(employee, events[index]['client_id']): {'type': events[index]['type'], 'checkin': checkin.pk}
+        for index, checkin in accepted.items()
+    }
+    if remembered:
+        timeout = int(MAX_EVENT_AGE.total_seconds())
+        transaction.on_commit(lambda: cache.set_many(remembered, timeout))
+
+
+def _within_range(distances, index, location):
+    distance = distances.get((index, location.id))
+    return distance is not None and distance <= location.range_meters
+
+
+def _apply_events(employee, events, results, now):
+    """
+    Replay validated events against the employee's latest check-in in one
+    transaction. Rejections are written to results; returns the accepted
+    check-ins by event index.
+    """
+    accepted = {}
+    with transaction.atomic():
+        latest = CheckIn.objects.select_for_update().filter(
+            employee=employee
+        ).select_related('location').order_by('-check_in_time').first()
+
+        open_checkin = None
+        last_time = None
+        if latest:
+            if latest.check_out_time is None:
+                open_checkin = latest
+                last_time = latest.check_in_time
+            else:
+                last_time = latest.check_out_time
+
+        locations = Location.objects.in_bulk({
+            event['location_id'] for event in events.values() if event['type'] == 'check_in'
+        })
+        candidates = list(locations.values())
+        if open_checkin and open_checkin.location_id not in locations:
+            candidates.append(open_checkin.location)
+        distances = _distance_table(events, candidates)
+
+        to_create = []
+        to_update = []
+        for index in sorted(events, key=lambda i: events[i]['timestamp']):
+            event = events[index]
+            timestamp = event['timestamp']
+            error = None
+
+            if timestamp > now + CLOCK_SKEW:
+                error = 'Event timestamp is in the future'
+            elif timestamp < now - MAX_EVENT_AGE:
+                error = 'Event is too old to be synced'
+            elif last_time and timestamp < last_time:
+                error = 'Event is older than your latest check-in or check-out'
+            elif event['type'] == 'check_in':
+                location = locations.get(event['location_id'])
+                if open_checkin:
+                    error = 'You are already checked in at another location. Please check out first.'
+                elif location is None:
+                    error = 'Location not found'
+                elif not location.can_check_in(timezone.localtime(timestamp).time()):
+                    error = f'You can only check in 15 minutes before your shift starts at {location.start_time.strftime("%H:%M")}'
+                elif not _within_range(distances, index, location):
+                    error = f'You are not within range of this location. Please move closer to {location.name}'
+                else:
+                    open_checkin = CheckIn(
+                        employee=employee,
+                        location=location,
+                        check_in_time=timestamp,
+                        status='checked_in'
+                    )
+                    to_create.append(open_checkin)
+                    last_time = timestamp
+                    accepted[index] = open_checkin
+            else:
+                if not open_checkin:
+                    error = 'You are not currently checked in anywhere'
+                elif not _within_range(distances, index, open_checkin.location):
+                    error = f'You are not within range of this location. Please move closer to {open_checkin.location.name} to check out'
+                else:
+                    open_checkin.check_out_time = timestamp
+                    open_checkin.status = 'checked_out'
+                    open_checkin.duration = timestamp - open_checkin.check_in_time
+                    open_checkin.updated_at = now
+                    # Check-ins from this batch are inserted already closed
+                    if open_checkin.pk:
+                        to_update.append(open_checkin)
+                    last_time = timestamp
+                    accepted[index] = open_checkin
+                    open_checkin = None
+
+            if error:
+                results[index] = {'client_id': event['client_id'], 'status': 'rejected', 'error': error}
+
+        # Close the existing check-in before inserting any new ones
+        if to_update:
+            CheckIn.objects.bulk_update(to_update, ['check_out_time', 'status', 'duration', 'updated_at'])
+        if to_create:
+            CheckIn.objects.bulk_create(to_create)
+
+        for index in sorted(accepted, key=lambda i: events[i]['timestamp']):
+            if events[index]['type'] == 'check_in':
+                daily_stats.record_checkin(accepted[index])
+            else:
+                daily_stats.record_checkout(accepted[index])
+
+        if to_update:
+            presence.record_checkout(latest)
+        if open_checkin and open_checkin is not latest:
+            presence.record_checkin(open_checkin)
+
+        # One event per check-in touched, in its final state
+        for checkin in {id(checkin): checkin for checkin in accepted.values()}.values():
+            live.publish_checkin(checkin)
+            # Bulk writes send no post_save
+            timesheets.record_change(checkin)
+
+        _remember_accepted(employee, events, accepted)
+
+    return accepted
+
+
+def sync_checkin_events(employee, raw_events, now=None):
+    """
+    Validate and apply a batch of queued events for one employee. Events are
+    replayed in timestamp order and every accepted change is written in one
+    transaction. Events accepted by an earlier sync are not applied again but
+    reported as accepted, with their check-in's current state. Returns one
+    result per event, in the order they were sent.
+    """
+    now = now or timezone.now()
+    results = [None] * len(raw_events)
+    events = {}
+    seen_client_ids = set()
+
+    for index, raw_event in enumerate(raw_events):
+        serializer = CheckInEventSerializer(data=raw_event)
+        client_id = raw_event.get('client_id')
+        if not serializer.is_valid():
+            results[index] = {'client_id': client_id, 'status': 'rejected', 'errors': serializer.errors}
+        elif client_id in seen_client_ids:
+            results[index] = {'client_id': client_id, 'status': 'rejected', 'error': 'Duplicate client_id in batch'}
+        else:
+            seen_client_ids.add(client_id)
+            events[index] = serializer.validated_data
+
+    keys = {index: _accepted_key(employee, event['client_id']) for index, event in events.items()}
+    synced = cache.get_many(keys.values())
+    if synced:
+        checkins = CheckIn.objects.select_related('employee', 'location').in_bulk(
+            {entry['checkin'] for entry in synced.values()}
+        )
+        for index, key in keys.items():
+            if key in synced:
+                checkin = checkins.get(synced[key]['checkin'])
+                results[index] = {
+                    'client_id': events.pop(index)['client_id'],
+                    'status': 'accepted',
+                    'type': synced[key]['type'],
+                    # None once the check-in has been archived or deleted
+                    'checkin': CheckInSerializer(checkin).data if checkin else None,
+                }
+
+    for attempt in range(2):
+        try:
+            accepted = _apply_events(employee, events, results, now)
+            break
+        except IntegrityError:
+            # checkin_one_open_per_employee: a check-in from another request
+            # committed after we read the latest one, so replay against it
+            if attempt:
+                raise
+
+    for index, checkin in accepted.items():
+        results[index] = {
+            'client_id': events[index]['client_id'],
+            'status': 'accepted',
+            'type': events[index]['type'],
+            'checkin': CheckInSerializer(checkin).data,
+        }
+    return results
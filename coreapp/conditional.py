@@ -0,0 +1,62 @@
+"""
+Conditional GET for list endpoints whose rows track updated_at.
+
+The validators come from one aggregate query: the ETag combines the row count
+(which catches deletions) with the latest updated_at (which catches inserts and
+edits), and Last-Modified is that same timestamp. Clients that send them back
+in If-None-Match or If-Modified-Since get a bodyless 304 while nothing changed.
+Bulk QuerySet.update() calls skip auto_now, so they must set updated_at
+themselves for this to notice them.
+
+The same rows can be sent as different representations (a ?fields= selection,
+JSON or MessagePack), so the ETag also carries a variant tag for the one being
+sent, and responses vary on Accept.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+_AGGREGATES = {'count': Count('pk'), 'latest': Max('updated_at')}
+
+
+def representation(fields, media_type):
+    """Variant tag for a field selection (None for all fields) rendered as media_type"""
+    selection = ','.join(fields) if fields is not None else '*'
+    return hashlib.sha256(f'{selection};{media_type}'.encode()).hexdigest()[:16]
+
+
+def _validators(aggregate, variant):
+    latest = aggregate['latest']
+    version = int(latest.timestamp() * 1_000_000) if latest is not None else 0
+    etag = f'"{aggregate["count"]}-{version}-{variant}"' if variant else f'"{aggregate["count"]}-{version}"'
+    return etag, int(latest.timestamp()) if latest is not None else None
+
+
+def list_validators(queryset, variant=None):
+    """(ETag, Last-Modified as a Unix timestamp) for a queryset sent as the given representation() variant"""
+    return _validators(queryset.aggregate(**_AGGREGATES), variant)
+
+
+async def alist_validators(queryset, variant=None):
+    return _validators(await queryset.aaggregate(**_AGGREGATES), variant)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Responses depend on the user and the negotiated media type, and clients
+    # should always revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """The 304 (or 412) response when the request's preconditions say so, else None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
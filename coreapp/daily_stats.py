@@ -0,0 +1,154 @@
+"""
+Keeps DailyLocationStats up to date. Call these inside the transaction that
+writes the check-in so the counters commit or roll back with it.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .filters import day_range
+from .models import CheckIn, DailyLocationStats
+from . import archive
+
+# Check-ins that started longer ago than this (offline syncs) are backdated
+BACKDATED_AFTER = timedelta(minutes=2)
+
+
+def _bump(location_id, day, initial, **updates):
+    """Apply F() updates to a day's row, creating it with initial values if missing"""
+    rows = DailyLocationStats.objects.filter(location_id=location_id, date=day)
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailyLocationStats.objects.create(location_id=location_id, date=day, **initial)
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(**updates)
+
+
+def record_checkin(checkin):
+    if timezone.now() - checkin.check_in_time <= BACKDATED_AFTER:
+        # Count this check-in even if a synced batch already closed it
+        occupancy = CheckIn.objects.filter(
+            location_id=checkin.location_id,
+            check_out_time__isnull=True
+        ).exclude(pk=checkin.pk).count() + 1
+    else:
+        # The current occupancy says nothing about a backdated check-in's day
+        occupancy = _day_peak(checkin.location_id, timezone.localdate(checkin.check_in_time))
+    _bump(
+        checkin.location_id,
+        timezone.localdate(checkin.check_in_time),
+        {'checkin_count': 1, 'peak_occupancy': occupancy},
+        checkin_count=F('checkin_count') + 1,
+        peak_occupancy=Greatest(F('peak_occupancy'), Value(occupancy)),
+    )
+
+
+def record_checkout(checkin):
+    seconds = int(checkin.duration.total_seconds())
+    _bump(
+        checkin.location_id,
+        timezone.localdate(checkin.check_in_time),
+        {'checkout_count': 1, 'total_seconds': seconds},
+        checkout_count=F('checkout_count') + 1,
+        total_seconds=F('total_seconds') + seconds,
+    )
+
+
+def totals_for(day):
+    """Check-ins, check-outs and worked seconds across all locations for a day"""
+    totals = DailyLocationStats.objects.filter(date=day).aggregate(
+        checkins=Sum('checkin_count'),
+        checkouts=Sum('checkout_count'),
+        seconds=Sum('total_seconds'),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def total_checkins():
+    """Check-ins ever recorded, archived ones included, summed over the rollup"""
+    return DailyLocationStats.objects.aggregate(total=Sum('checkin_count'))['total'] or 0
+
+
+def _peak_occupancy(checkins, start, end):
+    """
+    Sweep one location's check-ins in time order and return the highest
+    occupancy reached right after each check-in, keyed by local date.
+    """
+    events = []
+    for check_in_time, check_out_time in checkins:
+        events.append((check_in_time, 1))
+        if check_out_time is not None:
+            events.append((check_out_time, -1))
+    # At equal times, process check-outs first
+    events.sort()
+
+    peaks = defaultdict(int)
+    occupancy = 0
+    for moment, change in events:
+        occupancy += change
+        if change > 0 and start <= moment < end:
+            day = timezone.localdate(moment)
+            peaks[day] = max(peaks[day], occupancy)
+    return peaks
+
+
+def _stays(location_id, start, end):
+    """(check-in, check-out) times of a location's stays overlapping [start, end)"""
+    return archive.combined(
+        lambda checkins: checkins.filter(
+            location_id=location_id,
+            check_in_time__lt=end
+        ).exclude(check_out_time__lt=start).values_list('check_in_time', 'check_out_time')
+    )
+
+
+def _day_peak(location_id, day):
+    start, end = day_range(day)
+    return _peak_occupancy(_stays(location_id, start, end).iterator(), start, end).get(day, 0)
+
+
+def rebuild(since, until):
+    """
+    Recompute the rollup rows for every day from since to until (inclusive)
+    from the CheckIn and CheckInArchive tables. Returns the number of rows written.
+    """
+    start, _ = day_range(since)
+    _, end = day_range(until)
+
+    rows = {}
+    # A day can have groups in both tables
+    grouped = archive.combined(
+        lambda checkins: checkins.filter(
+            check_in_time__gte=start,
+            check_in_time__lt=end
+        ).annotate(day=TruncDate('check_in_time')).values('location_id', 'day').annotate(
+            checkin_count=Count('id'),
+            checkout_count=Count('check_out_time'),
+            total_duration=Sum('duration'),
+        )
+    )
+    for group in grouped:
+        key = (group['location_id'], group['day'])
+        if key not in rows:
+            rows[key] = DailyLocationStats(location_id=group['location_id'], date=group['day'])
+        rows[key].checkin_count += group['checkin_count']
+        rows[key].checkout_count += group['checkout_count']
+        rows[key].total_seconds += int((group['total_duration'] or timedelta()).total_seconds())
+
+    # Peak occupancy also depends on stays that started before the range
+    for location_id in {location_id for location_id, _ in rows}:
+        for day, peak in _peak_occupancy(_stays(location_id, start, end).iterator(), start, end).items():
+            if (location_id, day) in rows:
+                rows[(location_id, day)].peak_occupancy = peak
+
+    with transaction.atomic():
+        DailyLocationStats.objects.filter(date__gte=since, date__lte=until).delete()
+        DailyLocationStats.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
@@ -0,0 +1,46 @@
+"""
+Sparse fieldsets for the mobile list endpoints. `?fields=a,b` returns only
+those fields and `?exclude=a,b` all but those. The read-only serializers in
+serializers.py list the model fields behind each output field, so the query
+loads only those columns and joins only the tables they need.
+"""
+
+
+def _names(value):
+    return [name for name in (value or '').split(',') if name]
+
+
+def parse_fieldset(params, serializer_class):
+    """The fields selected by ?fields= and ?exclude=, in output order, or None for all of them"""
+    fields = _names(params.get('fields'))
+    exclude = _names(params.get('exclude'))
+    unknown = [name for name in fields + exclude if name not in serializer_class.sources]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    if not fields and not exclude:
+        return None
+    selected = [
+        name for name in serializer_class.sources
+        if (not fields or name in fields) and name not in exclude
+    ]
+    if not selected:
+        raise ValueError('No fields selected')
+    return selected
+
+
+def restrict_queryset(queryset, serializer_class, fields, required=()):
+    """
+    Load only the columns and related tables the selected fields read, plus
+    the model fields in required (e.g. the ones pagination orders by).
+    """
+    if fields is None:
+        return queryset
+    columns = set(required)
+    for name in fields:
+        columns.update(serializer_class.sources[name])
+    joins = {column.rsplit('__', 1)[0] for column in columns if '__' in column}
+    # select_related() with no arguments would follow every relation
+    queryset = queryset.select_related(None)
+    if joins:
+        queryset = queryset.select_related(*joins)
+    return queryset.only(*columns)
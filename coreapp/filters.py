@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+def day_range(day):
+    """
+    Return the aware [start, end) datetimes covering a local calendar day.
+    Range lookups on check_in_time can use an index, unlike __date lookups.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def _parse_day(value, name):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+    return day
+
+
+def filter_checkins(queryset, params):
+    """
+    Apply the admin check-in filters from a query dict:
+    location, status, employee, search, date_from and date_to (inclusive).
+    Raises ValueError for malformed values.
+    """
+    location = params.get('location')
+    if location:
+        try:
+            queryset = queryset.filter(location_id=int(location))
+        except ValueError:
+            raise ValueError('location must be a location id')
+
+    status = params.get('status')
+    if status:
+        if status not in dict(queryset.model.STATUS_CHOICES):
+            raise ValueError(f'Unknown status: {status}')
+        queryset = queryset.filter(status=status)
+
+    employee = params.get('employee')
+    if employee:
+        queryset = queryset.filter(
+            Q(employee__email=employee) | Q(employee__employee_id=employee)
+        )
+
+    search = params.get('search', '').strip()
+    if search:
+        queryset = queryset.filter(
+            Q(employee__full_name__icontains=search) | Q(location__name__icontains=search)
+        )
+
+    date_from = params.get('date_from')
+    if date_from:
+        start, _ = day_range(_parse_day(date_from, 'date_from'))
+        queryset = queryset.filter(check_in_time__gte=start)
+
+    date_to = params.get('date_to')
+    if date_to:
+        _, end = day_range(_parse_day(date_to, 'date_to'))
+        queryset = queryset.filter(check_in_time__lt=end)
+
+    return queryset
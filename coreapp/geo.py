@@ -0,0 +1,125 @@
+import heapq
+import math
+from collections import defaultdict
+
+from django.core.cache import cache
+
+try:
+    import numpy as np
+except ImportError:  # numpy is in requirements.txt; without it haversine_distances falls back to a loop
+    np = None
+
+EARTH_RADIUS_METERS = 6371000
+
+# Grid cells are this many degrees on each side (about 1.1 km of latitude)
+GRID_CELL_DEGREES = 0.01
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+# Bumped whenever a location changes so every worker rebuilds its grid
+GRID_VERSION_KEY = 'coreapp:location-grid-version'
+
+
+def haversine_meters(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters between two points given in degrees"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+
+def haversine_distances(lats1, lngs1, lats2, lngs2):
+    """
+    Element-wise great-circle distances in meters between two equally long
+    sequences of points, computed in a single vectorized numpy pass (a plain
+    loop if numpy is missing).
+    """
+    if np is None:
+        return [haversine_meters(*point) for point in zip(lats1, lngs1, lats2, lngs2)]
+
+    lat1 = np.radians(np.asarray(lats1, dtype=float))
+    lat2 = np.radians(np.asarray(lats2, dtype=float))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs2, dtype=float) - np.asarray(lngs1, dtype=float))
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return (2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))).tolist()
+
+
+def _cell(lat, lng):
+    return math.floor(lat / GRID_CELL_DEGREES), math.floor(lng / GRID_CELL_DEGREES)
+
+
+class LocationGrid:
+    """
+    Fixed-size grid over location coordinates. A lookup only measures the
+    locations in the cells that overlap the search radius instead of every row.
+    """
+
+    def __init__(self, entries):
+        # entries: iterable of (latitude, longitude, range_meters, payload)
+        self.cells = defaultdict(list)
+        self.max_range = 0
+        for entry in entries:
+            lat, lng, range_meters, _ = entry
+            self.cells[_cell(lat, lng)].append(entry)
+            self.max_range = max(self.max_range, range_meters)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.cells.values())
+
+    def nearest(self, lat, lng, k, radius=None):
+        """
+        Return up to k (distance, payload) pairs, nearest first. With a radius,
+        every location within that many meters qualifies; without one, only
+        locations whose own check-in range covers the point do.
+        """
+        search_radius = radius if radius is not None else self.max_range
+        dlat = search_radius / METERS_PER_DEGREE
+        dlng = search_radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        min_row, min_col = _cell(lat - dlat, lng - dlng)
+        max_row, max_col = _cell(lat + dlat, lng + dlng)
+
+        matches = []
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                for loc_lat, loc_lng, range_meters, payload in self.cells.get((row, col), ()):
+                    distance = haversine_meters(lat, lng, loc_lat, loc_lng)
+                    limit = radius if radius is not None else range_meters
+                    if distance <= limit:
+                        matches.append((distance, payload))
+        return heapq.nsmallest(k, matches, key=lambda match: match[0])
+
+
+_grid = None
+_grid_version = None
+
+
+def invalidate_location_grid():
+    """Tell every worker to rebuild its grid on the next lookup"""
+    try:
+        cache.incr(GRID_VERSION_KEY)
+    except ValueError:
+        cache.set(GRID_VERSION_KEY, 1, timeout=None)
+
+
+def get_location_grid():
+    """Return the grid over active locations, rebuilding it if a location changed"""
+    global _grid, _grid_version
+    from .models import Location
+    from .serializers import LocationSerializer
+
+    version = cache.get(GRID_VERSION_KEY, 0)
+    if _grid is None or version != _grid_version:
+        locations = Location.objects.filter(
+            is_active=True,
+            latitude__isnull=False,
+            longitude__isnull=False
+        )
+        _grid = LocationGrid(
+            (float(location.latitude), float(location.longitude), location.range_meters,
+             LocationSerializer(location).data)
+            for location in locations
+        )
+        _grid_version = version
+    return _grid
@@ -0,0 +1,164 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A client that retries a request with the same Idempotency-Key header gets the
+stored response of the first attempt back instead of running the view again.
+Keys are scoped to the caller (their Authorization header, or their session
+user) and kept in Django's cache for IDEMPOTENCY_KEY_TTL seconds, so like the
+presence registry they need a shared CACHES backend when running more than
+one worker process. Only successful responses are stored: a rejected check-in
+(out of range, too early) changes nothing, so retrying it runs the view again.
+Views that report rejections with a 2xx status pass a store predicate that
+tells them apart.
+"""
+import asyncio
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+KEY_PREFIX = 'coreapp:idempotency:'
+MAX_KEY_LENGTH = 255
+
+# How long a request may hold its key before a retry may run it again
+LOCK_TIMEOUT = 30
+
+IN_PROGRESS = 'A request with this Idempotency-Key is still being processed.'
+KEY_REUSED = 'This Idempotency-Key was already used for a different request.'
+KEY_TOO_LONG = f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.'
+
+
+def _ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+
+def api_error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _cache_key(request, user, key):
+    authorization = request.headers.get('Authorization')
+    if authorization:
+        scope = 'auth:' + authorization
+    elif user is not None and user.is_authenticated:
+        scope = f'user:{user.pk}'
+    else:
+        return None
+    return KEY_PREFIX + hashlib.sha256(f'{scope}\n{key}'.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    return hashlib.sha256(b'\n'.join([request.method.encode(), request.path.encode(), request.body])).hexdigest()
+
+
+def _stored(response):
+    if hasattr(response, 'render'):
+        response.render()
+    return {
+        'status': response.status_code,
+        'content_type': response.get('Content-Type'),
+        'content': response.content,
+    }
+
+
+def _replay(stored):
+    response = HttpResponse(stored['content'], status=stored['status'], content_type=stored['content_type'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _should_store(response, store):
+    if not 200 <= response.status_code < 300 or response.streaming:
+        return False
+    return store is None or store(response)
+
+
+def json_status_success(response):
+    """store predicate for views that return {'status': 'error'} bodies with HTTP 200"""
+    try:
+        return json.loads(response.content).get('status') == 'success'
+    except (ValueError, AttributeError):
+        return False
+
+
+def _check(request, stored, error):
+    """Return the response for a key that has been seen before, or None"""
+    if stored is None:
+        return None
+    if stored.get('fingerprint') != _fingerprint(request):
+        return error(KEY_REUSED, 422)
+    if 'status' not in stored:
+        return error(IN_PROGRESS, 409)
+    return _replay(stored)
+
+
+def idempotent(view=None, *, error=api_error, store=None):
+    """
+    Replay stored responses for repeated Idempotency-Key headers. error builds
+    the views' own error response from (message, status); store, if given,
+    decides which 2xx responses count as successful and are kept. Works on sync
+    and async views; place it outside @api_view so a replay skips the whole view.
+    """
+    if view is None:
+        return lambda view: idempotent(view, error=error, store=store)
+
+    def prepare(request, user):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None, None
+        if len(key) > MAX_KEY_LENGTH:
+            return None, error(KEY_TOO_LONG, 400)
+        return _cache_key(request, user, key), None
+
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            cache_key, failure = prepare(request, await request.auser())
+            if failure:
+                return failure
+            if cache_key is None:
+                return await view(request, *args, **kwargs)
+
+            pending = {'fingerprint': _fingerprint(request)}
+            if not await cache.aadd(cache_key, pending, LOCK_TIMEOUT):
+                # _check() returns None if the entry expired since aadd()
+                return _check(request, await cache.aget(cache_key), error) or await view(request, *args, **kwargs)
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await cache.adelete(cache_key)
+                raise
+            if _should_store(response, store):
+                await cache.aset(cache_key, {**pending, **_stored(response)}, _ttl())
+            else:
+                await cache.adelete(cache_key)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cache_key, failure = prepare(request, request.user)
+        if failure:
+            return failure
+        if cache_key is None:
+            return view(request, *args, **kwargs)
+
+        pending = {'fingerprint': _fingerprint(request)}
+        if not cache.add(cache_key, pending, LOCK_TIMEOUT):
+            # _check() returns None if the entry expired since add()
+            return _check(request, cache.get(cache_key), error) or view(request, *args, **kwargs)
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            cache.delete(cache_key)
+            raise
+        if _should_store(response, store):
+            cache.set(cache_key, {**pending, **_stored(response)}, _ttl())
+        else:
+            cache.delete(cache_key)
+        return response
+    return wrapper
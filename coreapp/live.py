@@ -0,0 +1,199 @@
+"""
+Live check-in events for the admin dashboards, streamed as Server-Sent Events
+by async_api_views.api_admin_live.
+
+services.py publishes an event once each check-in or check-out commits. Every
+event is encoded once and fanned out to the subscribers' asyncio queues on
+their event loop; an idle subscriber is a parked coroutine and an empty queue,
+so one ASGI worker can hold hundreds. A subscriber that falls QUEUE_SIZE
+events behind loses its backlog and gets a `resync` event instead.
+
+InProcessBroadcast only reaches subscribers in the publishing process. With
+several workers, set LIVE_EVENTS_BACKEND to 'coreapp.live.CacheBroadcast',
+which relays events through the shared cache (Redis or Memcached).
+"""
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import daily_stats, presence
+
+QUEUE_SIZE = 100
+
+# Tells EventSource how long to wait, in milliseconds, before reconnecting
+RETRY = b'retry: 5000\n\n'
+KEEPALIVE = b': keepalive\n\n'
+
+
+def encode(event_type, data):
+    """One Server-Sent Event"""
+    return f'event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'.encode()
+
+
+RESYNC = encode('resync', {})
+
+
+class Subscription:
+    def __init__(self):
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def put(self, message):
+        """Queue an event; runs on the subscriber's event loop"""
+        if self.queue.full():
+            # Too far behind: drop the backlog and have the client reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """The next encoded event, or None if none arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _fan_out(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.put(message)
+
+
+class InProcessBroadcast:
+    """Delivers events to the subscribers of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Event loop -> its subscriptions
+        self._subscriptions = {}
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, message):
+        """Send an encoded event to every subscriber; callable from any thread"""
+        self._deliver(message)
+
+    def _deliver(self, message):
+        with self._lock:
+            targets = [(loop, tuple(subscriptions)) for loop, subscriptions in self._subscriptions.items()]
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(_fan_out, subscriptions, message)
+            except RuntimeError:
+                # The loop closed; its subscriptions are going away with it
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription()
+        with self._lock:
+            self._subscriptions.setdefault(loop, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscriptions.get(loop, set())
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    self._subscriptions.pop(loop, None)
+
+
+class CacheBroadcast(InProcessBroadcast):
+    """
+    Relays events between processes through the cache: publishers append to a
+    numbered ring of keys, and one task per event loop polls the sequence
+    number every POLL_INTERVAL seconds and fans new events out locally.
+    """
+    SEQUENCE_KEY = 'coreapp:live-sequence'
+    EVENT_KEY = 'coreapp:live-event:{}'
+    EVENT_TIMEOUT = 60
+    POLL_INTERVAL = 1
+
+    def __init__(self):
+        super().__init__()
+        self._pollers = {}
+
+    def has_subscribers(self):
+        # Other workers may have some
+        return True
+
+    def publish(self, message):
+        cache.add(self.SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(self.SEQUENCE_KEY)
+        cache.set(self.EVENT_KEY.format(sequence), message, self.EVENT_TIMEOUT)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        async with super().subscribe() as subscription:
+            loop = asyncio.get_running_loop()
+            if loop not in self._pollers:
+                self._pollers[loop] = loop.create_task(self._poll(loop))
+            yield subscription
+
+    async def _poll(self, loop):
+        last = await cache.aget(self.SEQUENCE_KEY, 0)
+        try:
+            while loop in self._subscriptions:
+                await asyncio.sleep(self.POLL_INTERVAL)
+                sequence = await cache.aget(self.SEQUENCE_KEY, 0)
+                if sequence > last:
+                    # Anything older would overflow the queues anyway
+                    keys = [
+                        self.EVENT_KEY.format(number)
+                        for number in range(max(last + 1, sequence - QUEUE_SIZE + 1), sequence + 1)
+                    ]
+                    messages = await cache.aget_many(keys)
+                    with self._lock:
+                        subscriptions = tuple(self._subscriptions.get(loop, ()))
+                    for key in keys:
+                        if key in messages:
+                            _fan_out(subscriptions, messages[key])
+                # A lower number means the cache was cleared
+                last = sequence
+        finally:
+            self._pollers.pop(loop, None)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(getattr(settings, 'LIVE_EVENTS_BACKEND', 'coreapp.live.InProcessBroadcast'))()
+
+
+def stats():
+    """The live counters of the admin dashboards"""
+    todays_totals = daily_stats.totals_for(timezone.localdate())
+    return {
+        'currently_checked_in': presence.checked_in_count(),
+        'todays_checkins': todays_totals['checkins'],
+        'todays_seconds': todays_totals['seconds'],
+    }
+
+
+def publish_checkin(checkin):
+    """Announce a check-in or check-out once the current transaction commits"""
+    event_type = 'check_out' if checkin.check_out_time else 'check_in'
+    transaction.on_commit(lambda: _publish(event_type, checkin))
+
+
+def _publish(event_type, checkin):
+    from .serializers import CheckInSerializer, checkin_record
+
+    backend = get_backend()
+    if not backend.has_subscribers():
+        return
+    backend.publish(encode(event_type, {
+        'checkin': CheckInSerializer(checkin).data,
+        'record': checkin_record(checkin),
+        'stats': stats(),
+    }))
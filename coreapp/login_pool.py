@@ -0,0 +1,177 @@
+"""
+Password verification for logins in a bounded pool of worker processes.
+
+Hashing a password takes a few hundred milliseconds of CPU, so running it on
+the request thread lets a burst of logins starve every other request. Logins
+instead hand the hash check to LOGIN_POOL_WORKERS processes; at most
+LOGIN_QUEUE_LIMIT hashes may be queued or running at once, and further
+attempts fail fast with LoginQueueFull so the view can answer 429. A login
+that waits longer than LOGIN_TIMEOUT gets LoginQueueFull too; its hash is
+cancelled if it has not started, and otherwise keeps its place in the limit
+until it finishes. Set LOGIN_POOL_WORKERS to 0 to verify on the request thread
+(the queue limit still applies).
+
+This replaces authenticate() for the email/password login forms, so it only
+supports the default ModelBackend.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+_lock = threading.Lock()
+_executor = None
+_pending = 0
+_rejected = 0
+_dummy_hash = None
+
+
+class LoginQueueFull(Exception):
+    """Too many logins are already waiting for a password check"""
+
+    def __init__(self, retry_after):
+        super().__init__('Too many logins in progress. Please try again shortly.')
+        self.retry_after = retry_after
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _init_worker(settings_module):
+    # Workers start in a fresh interpreter (forkserver or spawn, see
+    # _mp_context), so Django is not configured yet
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _verify(password, encoded):
+    """Return (valid, new_encoded); new_encoded is set when the hash needs upgrading"""
+    if not check_password(password, encoded):
+        return False, None
+    if identify_hasher(encoded).must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def _mp_context():
+    """
+    A start method that does not fork the web worker: forking copies its
+    threads' locks and open database connections into the pool processes.
+    forkserver where available (Linux), spawn elsewhere.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=_setting('LOGIN_POOL_WORKERS', 2),
+            mp_context=_mp_context(),
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'Checkinapp.settings'),),
+        )
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(_reset_executor)
+
+
+def _release(future=None):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _run(password, encoded):
+    global _pending, _rejected
+    with _lock:
+        if _pending >= _setting('LOGIN_QUEUE_LIMIT', 32):
+            _rejected += 1
+            raise LoginQueueFull(_setting('LOGIN_RETRY_AFTER', 5))
+        _pending += 1
+        executor = _get_executor() if _setting('LOGIN_POOL_WORKERS', 2) else None
+
+    if executor is None:
+        try:
+            return _verify(password, encoded)
+        finally:
+            _release()
+
+    try:
+        future = executor.submit(_verify, password, encoded)
+    except BrokenProcessPool:
+        _release()
+        _reset_executor()
+        return _verify(password, encoded)
+    # The slot is held until the hash is done or cancelled, not until we stop
+    # waiting, so the limit counts the work the pool really has queued
+    future.add_done_callback(_release)
+    try:
+        return future.result(timeout=_setting('LOGIN_TIMEOUT', 10))
+    except TimeoutError:
+        # Drop the hash if no worker has picked it up yet
+        future.cancel()
+        raise LoginQueueFull(_setting('LOGIN_RETRY_AFTER', 5))
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next login
+        _reset_executor()
+        return _verify(password, encoded)
+
+
+def authenticate_login(email, password):
+    """
+    Return the active user with this email and password, or None. Raises
+    LoginQueueFull when the pool is saturated.
+    """
+    global _dummy_hash
+    UserModel = get_user_model()
+    if not email or not password:
+        return None
+    try:
+        user = UserModel._default_manager.get_by_natural_key(email)
+    except UserModel.DoesNotExist:
+        # Hash anyway so response times don't reveal which emails exist
+        if _dummy_hash is None:
+            _dummy_hash = make_password('not a real password')
+        _run(password, _dummy_hash)
+        return None
+
+    valid, new_encoded = _run(password, user.password)
+    if not valid or not user.is_active:
+        return None
+    if new_encoded:
+        user.password = new_encoded
+        user.save(update_fields=['password'])
+    user.backend = BACKEND
+    return user
+
+
+def queue_depth():
+    """Number of logins waiting for or running a password check"""
+    return _pending
+
+
+def rejected_total():
+    """Number of logins refused because the queue was full, since startup"""
+    return _rejected
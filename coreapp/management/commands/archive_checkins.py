@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from coreapp import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move closed check-ins older than CHECKIN_ARCHIVE_AFTER (or --days) into '
+        'the CheckInArchive table, one batch per transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive check-ins that started more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help='Rows moved per transaction')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        retention = timedelta(days=options['days']) if options['days'] is not None else archive.archive_after()
+        before = timezone.now() - retention
+
+        total = 0
+        while True:
+            moved = archive.archive_batch(before, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived {total} check-ins...')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} check-ins that started before {before:%Y-%m-%d %H:%M}.'))
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from coreapp import api_views, async_api_views
+from coreapp.authentication import issue_token
+from coreapp.benchmarking import seed_data, throwaway_database
+from coreapp.models import Employee
+
+ENDPOINTS = {
+    'locations': 'api_locations',
+    'active_checkin': 'api_active_checkin',
+    'checkin_history': 'api_checkin_history',
+}
+
+# The benchmark routes each endpoint to both implementations under its own prefix
+urlpatterns = [
+    path(f'{prefix}/{name}/', getattr(module, view))
+    for prefix, module in (('wsgi', api_views), ('asgi', async_api_views))
+    for name, view in ENDPOINTS.items()
+]
+
+
+def _summary(timings, elapsed, errors):
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and compare concurrent request throughput of '
+        'the synchronous mobile API views through the WSGI handler with the '
+        'async views in coreapp/async_api_views.py through the ASGI handler.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and handler')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--checkins', type=int, default=20000)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.stdout.write(f"Seeding {options['checkins']} check-ins...")
+            seed_data(employees=options['concurrency'], locations=20, checkins=options['checkins'])
+            tokens = [issue_token(employee).key for employee in Employee.objects.filter(email__startswith='bench')]
+
+            results = {}
+            with override_settings(ROOT_URLCONF=__name__):
+                for name in ENDPOINTS:
+                    results[name] = {
+                        'wsgi': self.run_wsgi(f'/wsgi/{name}/', tokens, options['requests'], options['concurrency']),
+                        'asgi': asyncio.run(
+                            self.run_asgi(f'/asgi/{name}/', tokens, options['requests'], options['concurrency'])
+                        ),
+                    }
+
+        results = {
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'endpoints': results,
+        }
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_wsgi(self, url, tokens, requests, concurrency):
+        def call(index):
+            start = time.perf_counter()
+            response = Client().get(url, HTTP_AUTHORIZATION=f'Token {tokens[index % len(tokens)]}')
+            return (time.perf_counter() - start) * 1000, response.status_code != 200
+
+        def close_connection(_):
+            connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            outcomes = list(pool.map(call, range(requests)))
+            elapsed = time.perf_counter() - start
+            # Each worker thread opened its own database connection
+            list(pool.map(close_connection, range(concurrency)))
+        return _summary([ms for ms, _ in outcomes], elapsed, sum(error for _, error in outcomes))
+
+    async def run_asgi(self, url, tokens, requests, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(index):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers={'Authorization': f'Token {tokens[index % len(tokens)]}'})
+                return (time.perf_counter() - start) * 1000, response.status_code != 200
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(call(index) for index in range(requests)))
+        elapsed = time.perf_counter() - start
+        return _summary([ms for ms, _ in outcomes], elapsed, sum(error for _, error in outcomes))
+
+    def report(self, results):
+        self.stdout.write(f"\nDatabase: {results['database']}, concurrency {results['concurrency']}")
+        for name, handlers in results['endpoints'].items():
+            self.stdout.write(f'\n{name}')
+            for handler, stats in handlers.items():
+                self.stdout.write(
+                    f"  {handler}: {stats['requests_per_second']:>8} req/s  "
+                    f"median {stats['median_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms  "
+                    f"errors {stats['errors']}"
+                )
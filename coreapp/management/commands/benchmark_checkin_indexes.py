@@ -0,0 +1,102 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+
+from coreapp.benchmarking import seed_data, throwaway_database, time_call
+from coreapp.filters import day_range
+from coreapp.models import CheckIn
+
+# The last migration before the check-in indexes were added
+BEFORE_INDEXES = ('coreapp', '0002_location_latitude_location_longitude_and_more')
+WITH_INDEXES = ('coreapp', '0003_checkin_indexes')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and record query plans and timings for the '
+        'check-in lookups before and after the 0003_checkin_indexes migration.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--locations', type=int, default=50)
+        parser.add_argument('--checkins', type=int, default=200000)
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per query')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.stdout.write(f"Seeding {options['checkins']} check-ins...")
+            employee_ids, location_ids = seed_data(
+                employees=options['employees'],
+                locations=options['locations'],
+                checkins=options['checkins'],
+            )
+            queries = self.build_queries(employee_ids[0], location_ids[0])
+
+            self.migrate(BEFORE_INDEXES)
+            before = self.measure(queries, options['repeat'])
+            self.migrate(WITH_INDEXES)
+            after = self.measure(queries, options['repeat'])
+
+        results = {
+            'database': connection.vendor,
+            'checkins': options['checkins'],
+            'queries': {
+                name: {'before': before[name], 'after': after[name]}
+                for name in queries
+            },
+        }
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def build_queries(self, employee_id, location_id):
+        today_start, today_end = day_range(timezone.localdate())
+        return {
+            'open_checkin_for_employee': CheckIn.objects.filter(
+                employee_id=employee_id,
+                status='checked_in',
+                check_out_time__isnull=True
+            ),
+            'location_occupancy': CheckIn.objects.filter(
+                location_id=location_id,
+                check_out_time__isnull=True
+            ),
+            'todays_checkins': CheckIn.objects.filter(
+                check_in_time__gte=today_start,
+                check_in_time__lt=today_end
+            ),
+        }
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            # .first() for the single-row lookup and count() for the rest,
+            # matching how the views use them
+            if name == 'open_checkin_for_employee':
+                run, plan = queryset.first, queryset.order_by('-check_in_time')[:1].explain()
+            else:
+                run, plan = queryset.count, queryset.order_by().explain()
+            results[name] = {'plan': plan, **time_call(run, repeat)}
+        return results
+
+    def report(self, results):
+        for name, result in results['queries'].items():
+            before, after = result['before'], result['after']
+            speedup = before['median_ms'] / after['median_ms'] if after['median_ms'] else float('inf')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  before: {before['median_ms']:.3f} ms median  | {before['plan']}")
+            self.stdout.write(f"  after:  {after['median_ms']:.3f} ms median  | {after['plan']}")
+            self.stdout.write(f'  speedup: {speedup:.1f}x')
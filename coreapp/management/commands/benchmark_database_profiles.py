@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from coreapp import services
+from coreapp.benchmarking import seed_data, throwaway_database
+from coreapp.models import CheckIn, Employee, Location
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare check-in/check-out write throughput of the DATABASE_PROFILE '
+        'options. Each profile runs in its own process against a throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+',
+            help='Profiles to compare; defaults to sqlite and sqlite-wal, plus postgres when POSTGRES_DB is set'
+        )
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--seconds', type=float, default=10, help='How long each profile runs')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--worker', action='store_true', help='Run the current profile and print JSON (internal)')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_profile(options['threads'], options['seconds'])))
+            return
+
+        profiles = options['profiles'] or ['sqlite', 'sqlite-wal'] + (['postgres'] if os.environ.get('POSTGRES_DB') else [])
+        unknown = set(profiles) - set(settings.DATABASE_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        results = {}
+        for profile in profiles:
+            self.stdout.write(f'Running {profile}...')
+            results[profile] = self.spawn(profile, options['threads'], options['seconds'])
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def spawn(self, profile, threads, seconds):
+        # Settings are read once per process, so each profile gets its own
+        completed = subprocess.run(
+            [sys.executable, sys.argv[0], 'benchmark_database_profiles', '--worker',
+             '--threads', str(threads), '--seconds', str(seconds)],
+            env={**os.environ, 'DATABASE_PROFILE': profile},
+            capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed'}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_profile(self, threads, seconds):
+        with throwaway_database():
+            seed_data(employees=threads, locations=5, checkins=threads * 200)
+            # Start every writer checked out
+            CheckIn.objects.filter(check_out_time__isnull=True).delete()
+            employees = list(Employee.objects.filter(email__startswith='bench'))
+            location = Location.objects.first()
+
+            counts = [0] * threads
+            errors = [0] * threads
+            deadline = time.perf_counter() + seconds
+
+            def writer(slot):
+                employee = employees[slot]
+                try:
+                    while time.perf_counter() < deadline:
+                        try:
+                            services.check_out(services.check_in(employee, location))
+                            counts[slot] += 2
+                        except OperationalError:
+                            # "database is locked" once the busy timeout runs out
+                            errors[slot] += 1
+                finally:
+                    connections.close_all()
+
+            workers = [threading.Thread(target=writer, args=(slot,)) for slot in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+            return {
+                'vendor': connection.vendor,
+                'threads': threads,
+                'writes': sum(counts),
+                'errors': sum(errors),
+                'writes_per_second': round(sum(counts) / elapsed, 1),
+            }
+
+    def report(self, results):
+        self.stdout.write('')
+        for profile, stats in results.items():
+            if 'error' in stats:
+                self.stdout.write(f"{profile:>12}: failed ({stats['error']})")
+                continue
+            self.stdout.write(
+                f"{profile:>12}: {stats['writes_per_second']:>8} writes/s  "
+                f"{stats['writes']} writes, {stats['errors']} lock errors, {stats['threads']} threads"
+            )
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from coreapp.benchmarking import seed_data, throwaway_database, time_call
+from coreapp.models import CheckIn
+from coreapp.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from coreapp.serializers import CheckInReadSerializer, CheckInSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and time serializing and rendering a large '
+        'check-in list: DRF serializer and JSON renderer versus the read-only '
+        'serializer with the orjson and MessagePack renderers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Check-ins in the payload')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per pipeline')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.stdout.write(f"Seeding {options['rows']} check-ins...")
+            seed_data(employees=200, locations=20, checkins=options['rows'])
+            # Loaded once so the timings only cover serializing and rendering
+            checkins = list(CheckIn.objects.select_related('employee', 'location'))
+
+        drf_data = CheckInSerializer(checkins, many=True).data
+        fast_data = CheckInReadSerializer(checkins, many=True).data
+        if json.loads(JSONRenderer().render(drf_data)) != json.loads(ORJSONRenderer().render(fast_data)):
+            self.stderr.write(self.style.ERROR('The read-only serializer output differs from CheckInSerializer'))
+            return
+
+        pipelines = {
+            'drf_serializer+json': lambda: JSONRenderer().render(CheckInSerializer(checkins, many=True).data),
+            'read_serializer+json': lambda: JSONRenderer().render(CheckInReadSerializer(checkins, many=True).data),
+            'read_serializer+orjson': lambda: ORJSONRenderer().render(CheckInReadSerializer(checkins, many=True).data),
+        }
+        if msgpack is not None:
+            pipelines['read_serializer+msgpack'] = (
+                lambda: MessagePackRenderer().render(CheckInReadSerializer(checkins, many=True).data)
+            )
+
+        results = {'rows': len(checkins), 'pipelines': {}}
+        for name, run in pipelines.items():
+            results['pipelines'][name] = {'bytes': len(run()), **time_call(run, options['repeat'])}
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, results):
+        baseline = results['pipelines']['drf_serializer+json']['median_ms']
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{results['rows']} check-ins"))
+        for name, result in results['pipelines'].items():
+            speedup = baseline / result['median_ms'] if result['median_ms'] else float('inf')
+            self.stdout.write(
+                f"  {name:<24} {result['median_ms']:9.1f} ms median  "
+                f"{result['bytes']:>10} bytes  {speedup:5.1f}x"
+            )
+        if msgpack is None:
+            self.stdout.write('  (install msgpack to include the MessagePack renderer)')
@@ -0,0 +1,238 @@
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils import timezone
+
+from coreapp.models import Employee, Location
+
+LOADTEST_EMAIL = 'loadtest{}@example.com'
+LOADTEST_PASSWORD = 'loadtest-password'
+LOADTEST_LOCATION = 'Load Test Site'
+LATITUDE = Decimal('40.712800')
+LONGITUDE = Decimal('-74.006000')
+
+# Login attempts per employee when the server answers 429
+LOGIN_ATTEMPTS = 3
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return round(sorted_values[min(rank, len(sorted_values) - 1)], 2)
+
+
+class Recorder:
+    """Thread-safe collection of (latency, status) samples per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, endpoint, elapsed_ms, status):
+        with self.lock:
+            self.samples[endpoint].append((elapsed_ms, status))
+
+    def summary(self, duration):
+        results = {}
+        for endpoint, samples in self.samples.items():
+            latencies = sorted(ms for ms, _ in samples)
+            errors = sum(1 for _, status in samples if not 200 <= status < 300)
+            status_codes = defaultdict(int)
+            for _, status in samples:
+                status_codes[str(status)] += 1
+            results[endpoint] = {
+                'requests': len(samples),
+                'errors': errors,
+                'error_rate': round(errors / len(samples), 4),
+                'requests_per_second': round(len(samples) / duration, 2),
+                'p50_ms': _percentile(latencies, 50),
+                'p95_ms': _percentile(latencies, 95),
+                'p99_ms': _percentile(latencies, 99),
+                'status_codes': dict(status_codes),
+            }
+        return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a shift-start surge against a running server: N employees log in, '
+        'fetch locations, check in spread over a window and check out later. Reports '
+        'latency percentiles, error rates and throughput per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--employees', type=int, default=100)
+        parser.add_argument('--window', type=float, default=900,
+                            help='Seconds over which check-ins are spread (default: 15 minutes)')
+        parser.add_argument('--stay', type=float, default=60, help='Seconds between check-in and check-out')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--skip-setup', action='store_true',
+                            help='Reuse the loadtest employees and location from an earlier run')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the loadtest employees, location and their check-ins, then exit')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.cleanup()
+            return
+
+        # The server must use the same database as this command
+        if not options['skip_setup']:
+            self.setup(options['employees'])
+
+        rng = random.Random(options['seed'])
+        recorder = Recorder()
+        location_id = Location.objects.get(name=LOADTEST_LOCATION).id
+        base_url = options['base_url'].rstrip('/')
+
+        self.stdout.write(
+            f"Simulating {options['employees']} employees over {options['window']:.0f}s against {base_url}..."
+        )
+        threads = [
+            threading.Thread(target=self.employee_session, args=(
+                recorder, base_url, LOADTEST_EMAIL.format(i), location_id,
+                rng.uniform(0, options['window']), options['stay'], options['timeout'],
+            ))
+            for i in range(options['employees'])
+        ]
+        started_at = timezone.now()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        results = {
+            'started_at': started_at.isoformat(),
+            'duration_seconds': round(duration, 2),
+            'config': {
+                key: options[key] for key in ('base_url', 'employees', 'window', 'stay', 'seed')
+            },
+            'endpoints': recorder.summary(duration),
+        }
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def setup(self, count):
+        """Create (or reset) the loadtest employees and their location"""
+        self.cleanup(verbose=False)
+        password = make_password(LOADTEST_PASSWORD)
+        Employee.objects.bulk_create([
+            Employee(
+                email=LOADTEST_EMAIL.format(i),
+                full_name=f'Load Test Employee {i}',
+                employee_id=f'LOAD{i:06d}',
+                password=password,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        Location.objects.create(
+            name=LOADTEST_LOCATION,
+            address='1 Load Test Way',
+            start_time='00:15',
+            end_time='23:59',
+            range_meters=500,
+            latitude=LATITUDE,
+            longitude=LONGITUDE,
+        )
+
+    def cleanup(self, verbose=True):
+        # Check-ins, tokens and daily stats rows cascade
+        _, employees = Employee.objects.filter(email__startswith='loadtest', email__endswith='@example.com').delete()
+        _, locations = Location.objects.filter(name=LOADTEST_LOCATION).delete()
+        if verbose:
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {employees.get('coreapp.Employee', 0)} employees and "
+                f"{locations.get('coreapp.Location', 0)} locations."
+            ))
+
+    def request(self, recorder, endpoint, url, timeout, token=None, data=None, headers=None):
+        """Send one request, record it, and return (status, parsed JSON body or None, Retry-After)"""
+        request_headers = {'Content-Type': 'application/json', **(headers or {})}
+        if token:
+            request_headers['Authorization'] = f'Token {token}'
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(url, data=body, headers=request_headers, method='POST' if body else 'GET')
+
+        start = time.perf_counter()
+        retry_after = None
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, content = e.code, e.read()
+            retry_after = e.headers.get('Retry-After')
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            status, content = 0, b''
+        recorder.add(endpoint, (time.perf_counter() - start) * 1000, status)
+
+        try:
+            payload = json.loads(content) if content else None
+        except ValueError:
+            payload = None
+        return status, payload, retry_after
+
+    def employee_session(self, recorder, base_url, email, location_id, delay, stay, timeout):
+        time.sleep(delay)
+
+        token = None
+        for _ in range(LOGIN_ATTEMPTS):
+            status, payload, retry_after = self.request(
+                recorder, 'login', base_url + reverse('api_login'), timeout,
+                data={'email': email, 'password': LOADTEST_PASSWORD},
+            )
+            if status == 200:
+                token = payload['token']
+                break
+            if status != 429:
+                return
+            time.sleep(float(retry_after or 1))
+        if token is None:
+            return
+
+        self.request(recorder, 'locations', base_url + reverse('api_locations'), timeout, token=token)
+        self.request(recorder, 'active_checkin', base_url + reverse('api_active_checkin'), timeout, token=token)
+
+        position = {'latitude': str(LATITUDE), 'longitude': str(LONGITUDE)}
+        status, _, _ = self.request(
+            recorder, 'checkin', base_url + reverse('api_mobile_checkin'), timeout, token=token,
+            data={'location_id': location_id, **position},
+            headers={'Idempotency-Key': uuid.uuid4().hex},
+        )
+        if status != 200:
+            return
+
+        time.sleep(stay)
+        self.request(
+            recorder, 'checkout', base_url + reverse('api_mobile_checkout'), timeout, token=token,
+            data=position, headers={'Idempotency-Key': uuid.uuid4().hex},
+        )
+
+    def report(self, results):
+        self.stdout.write(f"\nFinished in {results['duration_seconds']}s\n")
+        self.stdout.write(f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for endpoint, stats in results['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<16}{stats['requests']:>9}{stats['errors']:>8}{stats['requests_per_second']:>9}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+            )
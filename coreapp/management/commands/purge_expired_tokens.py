@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from coreapp.authentication import token_expiry
+
+
+class Command(BaseCommand):
+    help = 'Delete mobile API tokens that have not been used within TOKEN_EXPIRY.'
+
+    def handle(self, *args, **options):
+        # Cached lookups of these tokens fail the expiry check on their own
+        deleted, _ = Token.objects.filter(created__lt=timezone.now() - token_expiry()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired tokens.'))
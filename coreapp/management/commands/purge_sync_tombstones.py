@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from coreapp.admin_sync import tombstone_retention
+from coreapp.models import DeletedRecord
+
+
+class Command(BaseCommand):
+    help = 'Delete admin sync tombstones older than SYNC_TOMBSTONE_RETENTION.'
+
+    def handle(self, *args, **options):
+        deleted, _ = DeletedRecord.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sync tombstones.'))
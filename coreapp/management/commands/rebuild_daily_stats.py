@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from coreapp import daily_stats
+from coreapp.models import CheckIn, CheckInArchive
+
+
+class Command(BaseCommand):
+    help = 'Backfill or recompute the DailyLocationStats rollup from the CheckIn and CheckInArchive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD); defaults to the first check-in')
+        parser.add_argument('--until', help='Last day to rebuild (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        since = self.parse_day(options['since'], '--since')
+        until = self.parse_day(options['until'], '--until') or timezone.localdate()
+
+        if since is None:
+            firsts = [
+                model.objects.aggregate(first=Min('check_in_time'))['first']
+                for model in (CheckIn, CheckInArchive)
+            ]
+            first = min((moment for moment in firsts if moment is not None), default=None)
+            if first is None:
+                self.stdout.write('No check-ins to roll up.')
+                return
+            since = timezone.localdate(first)
+
+        if since > until:
+            raise CommandError('--since must not be after --until')
+
+        written = daily_stats.rebuild(since, until)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} daily rows from {since} to {until}.'))
+
+    def parse_day(self, value, name):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError(f'{name} must be a date in YYYY-MM-DD format')
+        return day
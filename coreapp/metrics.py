@@ -0,0 +1,202 @@
+"""
+Per-endpoint request metrics, rendered in the Prometheus text format by the
+/metrics view.
+
+MetricsMiddleware records, for every resolved URL name, histograms of request
+latency, database queries per request, database time per request and response
+size. Each endpoint gets its fixed-size bucket arrays the first time it is
+seen; after that a request only increments counters. Metrics are kept per
+process, so scrape every worker when running more than one.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import login_pool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+QUERY_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Requests whose path did not resolve to a named URL
+UNRESOLVED = 'unresolved'
+
+# [query count, query seconds] for the request being handled. Context
+# variables follow the request into sync_to_async threads.
+_query_stats = ContextVar('query_stats', default=None)
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One slot per bound plus the +Inf bucket; not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+
+class EndpointMetrics:
+    __slots__ = ('lock', 'latency', 'queries', 'query_time', 'size', 'responses')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_time = Histogram(QUERY_TIME_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        # Responses by status class: 1xx, 2xx, 3xx, 4xx, 5xx
+        self.responses = [0] * 5
+
+    def observe(self, seconds, queries, query_seconds, size, status):
+        with self.lock:
+            self.latency.observe(seconds)
+            self.queries.observe(queries)
+            self.query_time.observe(query_seconds)
+            if size is not None:
+                self.size.observe(size)
+            self.responses[min(max(status // 100, 1), 5) - 1] += 1
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def _endpoint(name):
+    metrics = _endpoints.get(name)
+    if metrics is None:
+        with _endpoints_lock:
+            metrics = _endpoints.setdefault(name, EndpointMetrics())
+    return metrics
+
+
+def _count_queries(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = [0, 0.0]
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        _record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = [0, 0.0]
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        _record(request, response, time.perf_counter() - start, stats)
+        return response
+
+
+def _record(request, response, elapsed, stats):
+    match = request.resolver_match
+    name = match.view_name if match and match.url_name else UNRESOLVED
+    size = None if response.streaming else len(response.content)
+    _endpoint(name).observe(elapsed, stats[0], stats[1], size, response.status_code)
+
+
+def _histogram_lines(metric, histograms):
+    lines = []
+    for name, histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(histogram.bounds + ('+Inf',), histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{view="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{view="{name}"}} {histogram.total}')
+        lines.append(f'{metric}_count{{view="{name}"}} {cumulative}')
+    return lines
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _endpoints_lock:
+        endpoints = sorted(_endpoints.items())
+
+    snapshots = []
+    for name, metrics in endpoints:
+        with metrics.lock:
+            snapshots.append((name, {
+                'latency': _copy(metrics.latency),
+                'queries': _copy(metrics.queries),
+                'query_time': _copy(metrics.query_time),
+                'size': _copy(metrics.size),
+                'responses': list(metrics.responses),
+            }))
+
+    lines = []
+    for metric, key, help_text in (
+        ('checkinapp_request_duration_seconds', 'latency', 'Request latency by URL name'),
+        ('checkinapp_request_db_queries', 'queries', 'Database queries per request by URL name'),
+        ('checkinapp_request_db_seconds', 'query_time', 'Database time per request by URL name'),
+        ('checkinapp_response_size_bytes', 'size', 'Response body size by URL name'),
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        lines.extend(_histogram_lines(metric, [(name, snapshot[key]) for name, snapshot in snapshots]))
+
+    lines.append('# HELP checkinapp_responses_total Responses by URL name and status class')
+    lines.append('# TYPE checkinapp_responses_total counter')
+    for name, snapshot in snapshots:
+        for index, count in enumerate(snapshot['responses']):
+            if count:
+                lines.append(f'checkinapp_responses_total{{view="{name}",code="{index + 1}xx"}} {count}')
+
+    lines.append('# HELP checkinapp_login_queue_depth Logins waiting for or running a password check')
+    lines.append('# TYPE checkinapp_login_queue_depth gauge')
+    lines.append(f'checkinapp_login_queue_depth {login_pool.queue_depth()}')
+    lines.append('# HELP checkinapp_login_rejected_total Logins refused because the login queue was full')
+    lines.append('# TYPE checkinapp_login_rejected_total counter')
+    lines.append(f'checkinapp_login_rejected_total {login_pool.rejected_total()}')
+    return '\n'.join(lines) + '\n'
+
+
+def _copy(histogram):
+    copy = Histogram(histogram.bounds)
+    copy.counts = list(histogram.counts)
+    copy.total = histogram.total
+    return copy
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapp', '0002_location_latitude_location_longitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(condition=models.Q(('check_out_time__isnull', True), ('status', 'checked_in')), fields=['employee', '-check_in_time'], name='checkin_open_employee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(fields=['location', 'check_out_time'], name='checkin_location_checkout_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(fields=['check_in_time'], name='checkin_check_in_time_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapp', '0003_checkin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLocationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('checkin_count', models.PositiveIntegerField(default=0)),
+                ('checkout_count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.BigIntegerField(default=0)),
+                ('peak_occupancy', models.PositiveIntegerField(default=0, help_text='Most employees checked in at once')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='coreapp.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_stats_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('location', 'date'), name='daily_stats_location_date_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+def close_duplicate_open_checkins(apps, schema_editor):
+    """
+    Before the constraint, concurrent check-ins could leave an employee with
+    several open check-ins. Keep the latest one open and close the others at
+    the time the next one started.
+    """
+    CheckIn = apps.get_model('coreapp', 'CheckIn')
+    open_checkins = CheckIn.objects.filter(check_out_time__isnull=True).order_by('employee_id', '-check_in_time')
+
+    latest_by_employee = {}
+    for checkin in open_checkins:
+        later = latest_by_employee.get(checkin.employee_id)
+        if later is None:
+            latest_by_employee[checkin.employee_id] = checkin
+            continue
+        checkin.check_out_time = max(later.check_in_time, checkin.check_in_time)
+        checkin.duration = checkin.check_out_time - checkin.check_in_time
+        checkin.status = 'checked_out'
+        checkin.save(update_fields=['check_out_time', 'duration', 'status', 'updated_at'])
+        latest_by_employee[checkin.employee_id] = checkin
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapp', '0004_daily_location_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_checkins, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='checkin',
+            name='checkin_open_employee_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='checkin',
+            constraint=models.UniqueConstraint(condition=models.Q(('check_out_time__isnull', True)), fields=('employee',), name='checkin_one_open_per_employee'),
+        ),
+    ]
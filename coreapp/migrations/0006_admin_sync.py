@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapp', '0005_checkin_one_open_per_employee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('employee', 'Employee'), ('location', 'Location'), ('checkin', 'Check-in')], max_length=20)),
+                ('object_id', models.CharField(max_length=254)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(fields=['updated_at'], name='checkin_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedrecord',
+            index=models.Index(fields=['deleted_at'], name='deleted_record_deleted_at_idx'),
+        ),
+    ]
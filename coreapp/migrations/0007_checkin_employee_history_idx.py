@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapp', '0006_admin_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(fields=['employee', '-check_in_time', '-id'], name='checkin_employee_history_idx'),
+        ),
+    ]
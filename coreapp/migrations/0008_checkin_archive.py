@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coreapp', '0007_checkin_employee_history_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('check_in_time', models.DateTimeField()),
+                ('check_out_time', models.DateTimeField()),
+                ('status', models.CharField(choices=[('checked_in', 'Checked In'), ('checked_out', 'Checked Out')], default='checked_out', max_length=20)),
+                ('duration', models.DurationField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_check_ins', to=settings.AUTH_USER_MODEL)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_check_ins', to='coreapp.location')),
+            ],
+            options={
+                'ordering': ['-check_in_time'],
+                'indexes': [models.Index(fields=['check_in_time'], name='checkin_archive_time_idx'), models.Index(fields=['employee', 'check_in_time'], name='checkin_archive_employee_idx')],
+            },
+        ),
+    ]
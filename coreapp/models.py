@@ -3,7 +3,8 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
 import uuid
 from datetime import datetime, timedelta
-import math
+
+from .geo import haversine_meters
 
 class UserManager(BaseUserManager):
     def create_user(self, email, full_name, password=None, **extra_fields):
@@ -39,6 +40,7 @@ class Employee(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     employee_id = models.CharField(max_length=20, unique=True)
     role = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name']
@@ -97,19 +99,10 @@ class Location(models.Model):
         if self.latitude is None or self.longitude is None:
             return False
             
-        # Convert decimal degrees to radians
-        user_lat_rad = math.radians(float(user_lat))
-        user_lng_rad = math.radians(float(user_lng))
-        loc_lat_rad = math.radians(float(self.latitude))
-        loc_lng_rad = math.radians(float(self.longitude))
-        
-        # Haversine formula
-        dlon = loc_lng_rad - user_lng_rad
-        dlat = loc_lat_rad - user_lat_rad
-        a = math.sin(dlat/2)**2 + math.cos(user_lat_rad) * math.cos(loc_lat_rad) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371000  # Earth radius in meters
-        distance = c * r
+        distance = haversine_meters(
+            float(user_lat), float(user_lng),
+            float(self.latitude), float(self.longitude)
+        )
         
         return distance <= self.range_meters
 
@@ -130,6 +123,25 @@ class CheckIn(models.Model):
     
     class Meta:
         ordering = ['-check_in_time']
+        constraints = [
+            # At most one open check-in per employee; also the index behind
+            # looking up an employee's open check-in
+            models.UniqueConstraint(
+                fields=['employee'],
+                condition=models.Q(check_out_time__isnull=True),
+                name='checkin_one_open_per_employee',
+            ),
+        ]
+        indexes = [
+            # Who is still checked in at a location
+            models.Index(fields=['location', 'check_out_time'], name='checkin_location_checkout_idx'),
+            # Date-range counts on the dashboards
+            models.Index(fields=['check_in_time'], name='checkin_check_in_time_idx'),
+            # An employee's history, paged newest first on (check_in_time, id)
+            models.Index(fields=['employee', '-check_in_time', '-id'], name='checkin_employee_history_idx'),
+            # Rows changed since an admin sync cursor
+            models.Index(fields=['updated_at'], name='checkin_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.employee.full_name} - {self.location.name} - {self.check_in_time.date()}"
@@ -139,3 +151,80 @@ class CheckIn(models.Model):
         if self.check_out_time and self.check_in_time:
             self.duration = self.check_out_time - self.check_in_time
         super().save(*args, **kwargs)
+
+
+class CheckInArchive(models.Model):
+    """
+    Closed check-ins moved out of CheckIn by the archive_checkins command once
+    they are older than CHECKIN_ARCHIVE_AFTER. Rows keep their CheckIn id.
+    """
+    STATUS_CHOICES = CheckIn.STATUS_CHOICES
+    
+    id = models.BigIntegerField(primary_key=True)
+    # PROTECT: deleting an employee or location must not silently drop history
+    employee = models.ForeignKey(Employee, on_delete=models.PROTECT, related_name='archived_check_ins')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='archived_check_ins')
+    check_in_time = models.DateTimeField()
+    check_out_time = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='checked_out')
+    duration = models.DurationField()
+    
+    class Meta:
+        ordering = ['-check_in_time']
+        indexes = [
+            # Date-range reports over archived months
+            models.Index(fields=['check_in_time'], name='checkin_archive_time_idx'),
+            models.Index(fields=['employee', 'check_in_time'], name='checkin_archive_employee_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.location_id} - {self.check_in_time.date()}"
+
+
+class DailyLocationStats(models.Model):
+    """
+    Per-location, per-day counters, updated in the same transaction as each
+    check-in and check-out. Everything is attributed to the local date of the
+    check-in, so hours worked past midnight count towards the day the shift started.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    checkin_count = models.PositiveIntegerField(default=0)
+    checkout_count = models.PositiveIntegerField(default=0)
+    total_seconds = models.BigIntegerField(default=0)
+    peak_occupancy = models.PositiveIntegerField(default=0, help_text="Most employees checked in at once")
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'date'], name='daily_stats_location_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='daily_stats_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.location.name} - {self.date}"
+
+
+class DeletedRecord(models.Model):
+    """
+    Tombstone for a deleted employee, location or check-in, so admin sync
+    clients can drop rows they already have. Kept for SYNC_TOMBSTONE_RETENTION.
+    """
+    MODEL_CHOICES = [
+        ('employee', 'Employee'),
+        ('location', 'Location'),
+        ('checkin', 'Check-in'),
+    ]
+    
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.CharField(max_length=254)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at'], name='deleted_record_deleted_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
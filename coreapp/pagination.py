@@ -0,0 +1,77 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Mobile check-in history pages
+HISTORY_PAGE_SIZE = 20
+
+
+def encode_cursor(checkin):
+    """Encode the (check_in_time, id) position of a check-in as an opaque cursor"""
+    raw = f'{checkin.check_in_time.isoformat()}|{checkin.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (check_in_time, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        check_in_time = parse_datetime(timestamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        check_in_time = None
+    if check_in_time is None:
+        raise ValueError('Invalid cursor')
+    return check_in_time, pk
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if not value:
+        return default
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise ValueError('page_size must be a number')
+    if page_size < 1:
+        raise ValueError('page_size must be positive')
+    return min(page_size, maximum)
+
+
+def _page_query(queryset, cursor, page_size):
+    queryset = queryset.order_by('-check_in_time', '-id')
+    if cursor:
+        check_in_time, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(check_in_time__lt=check_in_time) | Q(check_in_time=check_in_time, id__lt=pk)
+        )
+    # One extra row to find out whether there is another page
+    return queryset[:page_size + 1]
+
+
+def _split_page(records, page_size):
+    next_cursor = None
+    if len(records) > page_size:
+        records = records[:page_size]
+        next_cursor = encode_cursor(records[-1])
+    return records, next_cursor
+
+
+def paginate_checkins(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of check-ins, newest first, and the cursor for the next page.
+    Uses a keyset on (check_in_time, id) so every page costs the same no matter
+    how deep the client has scrolled. next_cursor is None on the last page.
+    """
+    return _split_page(list(_page_query(queryset, cursor, page_size)), page_size)
+
+
+async def apaginate_checkins(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """paginate_checkins() for async views"""
+    records = [checkin async for checkin in _page_query(queryset, cursor, page_size)]
+    return _split_page(records, page_size)
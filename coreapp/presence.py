@@ -0,0 +1,252 @@
+"""
+Registry of who is checked in right now, keyed by employee and by location.
+
+The registry lives in Django's cache so every worker reads the same data.
+Each open check-in is stored under its employee's key, and each location
+keeps the list of employees checked in there, so a check-in or check-out
+rewrites a couple of small keys rather than the whole registry. Check-in and
+check-out paths update it after their transaction commits, and it is rebuilt
+from the database whenever it is missing or has expired.
+
+All keys are namespaced by a generation number. A rebuild starts a new
+generation, and an update that cannot get the lock bumps it, so a rebuild that
+loaded the database before that update committed never becomes visible.
+
+With a per-process cache (the default LocMemCache) each worker would keep its
+own registry and miss the other workers' updates, so active_checkin_for()
+reads the database instead until a shared backend (Redis or Memcached) is
+configured.
+"""
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+GENERATION_KEY = 'coreapp:presence-generation'
+LOCK_KEY = 'coreapp:presence-lock'
+REGISTRY_KEY = 'coreapp:presence:{generation}:registry'
+EMPLOYEE_KEY = 'coreapp:presence:{generation}:employee:{employee}'
+LOCATION_KEY = 'coreapp:presence:{generation}:location:{location}'
+
+# Rebuild from the database at least this often, in seconds
+PRESENCE_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 5
+LOCK_ATTEMPTS = 50
+LOCK_WAIT = 0.005
+# Entries outlive the registry key that makes them visible
+ENTRY_TIMEOUT = PRESENCE_TIMEOUT + LOCK_TIMEOUT
+
+
+def shared_cache():
+    """Whether the default cache is shared between worker processes"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+@contextmanager
+def _lock():
+    """Yield True while holding the registry lock, or False if it stayed busy"""
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+            try:
+                yield True
+            finally:
+                cache.delete(LOCK_KEY)
+            return
+        time.sleep(LOCK_WAIT)
+    yield False
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _bump():
+    """Start a new generation, which hides the registry and any rebuild in flight"""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(GENERATION_KEY, generation, None)
+        return generation
+
+
+def _entry(checkin):
+    from .serializers import CheckInSerializer
+    return dict(CheckInSerializer(checkin).data)
+
+
+def _load_active_checkin(employee_id):
+    from .models import CheckIn
+    checkin = CheckIn.objects.filter(
+        employee_id=employee_id,
+        status='checked_in',
+        check_out_time__isnull=True
+    ).select_related('employee', 'location').first()
+    return _entry(checkin) if checkin else None
+
+
+def rebuild():
+    """
+    Load every open check-in from the database into a new generation of the
+    registry. Returns {'employees': {id: entry}, 'locations': {id: [employee ids]}}.
+    """
+    from .models import CheckIn
+
+    with _lock() as locked:
+        # Only the lock holder starts a generation; without the lock a
+        # concurrent update could be lost, so only serve this snapshot
+        generation = _bump() if locked else None
+        open_checkins = CheckIn.objects.filter(
+            status='checked_in',
+            check_out_time__isnull=True
+        ).select_related('employee', 'location')
+
+        snapshot = {'employees': {}, 'locations': {}}
+        for checkin in open_checkins:
+            entry = _entry(checkin)
+            snapshot['employees'][entry['employee']] = entry
+            snapshot['locations'].setdefault(entry['location'], []).append(entry['employee'])
+
+        if locked:
+            cache.set_many({
+                **{
+                    EMPLOYEE_KEY.format(generation=generation, employee=employee_id): entry
+                    for employee_id, entry in snapshot['employees'].items()
+                },
+                **{
+                    LOCATION_KEY.format(generation=generation, location=location_id): employees
+                    for location_id, employees in snapshot['locations'].items()
+                },
+            }, ENTRY_TIMEOUT)
+            # Written last: the registry is visible once it is complete
+            cache.set(
+                REGISTRY_KEY.format(generation=generation),
+                {'expires': time.time() + PRESENCE_TIMEOUT, 'locations': list(snapshot['locations'])},
+                PRESENCE_TIMEOUT
+            )
+    return snapshot
+
+
+def _stored():
+    """(generation, registry) of the stored registry; registry is None if it is missing"""
+    generation = _generation()
+    return generation, cache.get(REGISTRY_KEY.format(generation=generation))
+
+
+def _remove(generation, registry, employee_id):
+    key = EMPLOYEE_KEY.format(generation=generation, employee=employee_id)
+    entry = cache.get(key)
+    if entry is None:
+        return
+    cache.delete(key)
+    location_key = LOCATION_KEY.format(generation=generation, location=entry['location'])
+    employees = cache.get(location_key) or []
+    if employee_id in employees:
+        employees.remove(employee_id)
+        cache.set(location_key, employees, ENTRY_TIMEOUT)
+
+
+def _add(generation, registry, entry):
+    _remove(generation, registry, entry['employee'])
+    cache.set(EMPLOYEE_KEY.format(generation=generation, employee=entry['employee']), entry, ENTRY_TIMEOUT)
+    location_key = LOCATION_KEY.format(generation=generation, location=entry['location'])
+    employees = cache.get(location_key) or []
+    employees.append(entry['employee'])
+    cache.set(location_key, employees, ENTRY_TIMEOUT)
+    if entry['location'] not in registry['locations']:
+        registry['locations'].append(entry['location'])
+        # Keep the expiry the rebuild gave it
+        cache.set(
+            REGISTRY_KEY.format(generation=generation), registry,
+            max(1, int(registry['expires'] - time.time()))
+        )
+
+
+def _update(change, *args):
+    with _lock() as locked:
+        if not locked:
+            # Drop the registry, and any rebuild in flight, rather than risk
+            # losing this change
+            _bump()
+            return
+        generation, registry = _stored()
+        # A missing registry is rebuilt from the database, which has this change
+        if registry is not None:
+            change(generation, registry, *args)
+
+
+def record_checkin(checkin):
+    """Add an open check-in once the current transaction commits"""
+    entry = _entry(checkin)
+    transaction.on_commit(lambda: _update(_add, entry))
+
+
+def record_checkout(checkin):
+    """Remove the employee's check-in once the current transaction commits"""
+    employee_id = checkin.employee_id
+    transaction.on_commit(lambda: _update(_remove, employee_id))
+
+
+def invalidate():
+    """Forget the registry so the next read rebuilds it from the database"""
+    transaction.on_commit(_bump)
+
+
+def active_checkin_for(employee_id):
+    """The serialized open check-in of an employee, or None"""
+    if not shared_cache():
+        return _load_active_checkin(employee_id)
+    generation, registry = _stored()
+    if registry is None:
+        return rebuild()['employees'].get(employee_id)
+    return cache.get(EMPLOYEE_KEY.format(generation=generation, employee=employee_id))
+
+
+async def aactive_checkin_for(employee_id):
+    """active_checkin_for() for async views"""
+    if shared_cache():
+        generation = await cache.aget(GENERATION_KEY)
+        if generation is not None and await cache.aget(REGISTRY_KEY.format(generation=generation)) is not None:
+            return await cache.aget(EMPLOYEE_KEY.format(generation=generation, employee=employee_id))
+    return await sync_to_async(active_checkin_for)(employee_id)
+
+
+def _locations():
+    """{location id: [employee ids]} from the registry"""
+    generation, registry = _stored()
+    if registry is None:
+        return rebuild()['locations']
+    keys = {
+        LOCATION_KEY.format(generation=generation, location=location_id): location_id
+        for location_id in registry['locations']
+    }
+    return {keys[key]: employees for key, employees in cache.get_many(keys).items() if employees}
+
+
+def checked_in_count():
+    return sum(len(employees) for employees in _locations().values())
+
+
+def location_occupancy():
+    """Number of employees checked in at each location, by location id"""
+    return {location_id: len(employees) for location_id, employees in _locations().items()}
+
+
+def checkins_at(location_id):
+    """Serialized open check-ins at a location"""
+    generation, registry = _stored()
+    if registry is None:
+        snapshot = rebuild()
+        return [snapshot['employees'][employee_id] for employee_id in snapshot['locations'].get(location_id, [])]
+    employees = cache.get(LOCATION_KEY.format(generation=generation, location=location_id)) or []
+    keys = [EMPLOYEE_KEY.format(generation=generation, employee=employee_id) for employee_id in employees]
+    entries = cache.get_many(keys)
+    return [entries[key] for key in keys if key in entries]
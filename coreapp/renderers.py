@@ -0,0 +1,47 @@
+"""
+Faster API renderers, enabled through REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].
+
+ORJSONRenderer produces the same JSON as DRF's JSONRenderer using orjson.
+Values orjson does not handle the same way as DRF (dates and times, Decimals,
+durations, lazy strings) go through DRF's own JSON encoder.
+
+MessagePackRenderer answers clients that send `Accept: application/msgpack`.
+It needs the optional msgpack package; settings.py only lists it when that
+package is installed.
+"""
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+# Serialize str/int/dict/list subclasses (ReturnDict, ErrorDetail...) natively
+# and hand date and time values to DRF's encoder for identical formatting
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Indented output (e.g. ?indent= in the Accept header) is rare; let DRF do it
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
@@ -1,4 +1,8 @@
+from operator import attrgetter
 from rest_framework import serializers
+from django.utils import timezone
+from django.utils.dateformat import format as format_date
+from django.utils.duration import duration_string
 from .models import Employee, Location, CheckIn
 
 class EmployeeSerializer(serializers.ModelSerializer):
@@ -25,12 +29,15 @@ class CheckInSerializer(serializers.ModelSerializer):
         read_only_fields = ['employee', 'duration']
 
     def get_duration_formatted(self, obj):
-        if obj.duration:
-            total_seconds = int(obj.duration.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            return f"{hours}h {minutes}m"
-        return None
+        return _format_duration(obj.duration)
+
+def _format_duration(duration):
+    if duration:
+        total_seconds = int(duration.total_seconds())
+        hours = total_seconds // 3600
+        minutes = (total_seconds % 3600) // 60
+        return f"{hours}h {minutes}m"
+    return None
 
 class CheckInCreateSerializer(serializers.Serializer):
     location_id = serializers.IntegerField()
@@ -39,4 +46,165 @@ class CheckInCreateSerializer(serializers.Serializer):
 
 class CheckOutSerializer(serializers.Serializer):
     latitude = serializers.DecimalField(max_digits=9, decimal_places=6)
-    longitude = serializers.DecimalField(max_digits=9, decimal_places=6)
\ No newline at end of file
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6)
+
+class NearbyLocationsSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    radius = serializers.IntegerField(min_value=1, max_value=5000, required=False,
+                                      help_text='Search radius in meters; defaults to each location\'s own range')
+
+class CheckInEventSerializer(serializers.Serializer):
+    client_id = serializers.CharField(max_length=64)
+    type = serializers.ChoiceField(choices=['check_in', 'check_out'])
+    location_id = serializers.IntegerField(required=False)
+    latitude = serializers.DecimalField(max_digits=9, decimal_places=6)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6)
+    timestamp = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data['type'] == 'check_in' and 'location_id' not in data:
+            raise serializers.ValidationError({'location_id': 'This field is required for check-in events.'})
+        return data
+
+class CheckInBatchSerializer(serializers.Serializer):
+    # Events are validated one by one so a bad event does not reject the batch
+    events = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=100)
+
+def checkin_record(checkin):
+    """A check-in as the admin monitor and log tables display it"""
+    check_in_time = timezone.localtime(checkin.check_in_time)
+    check_out_time = timezone.localtime(checkin.check_out_time) if checkin.check_out_time else None
+    return {
+        'id': checkin.id,
+        'employee_name': checkin.employee.full_name,
+        'employee_email': checkin.employee.email,
+        'location_id': checkin.location_id,
+        'location_name': checkin.location.name,
+        'check_in_time': check_in_time.isoformat(),
+        'check_in_display': format_date(check_in_time, 'M d, Y H:i'),
+        'check_out_time': check_out_time.isoformat() if check_out_time else None,
+        'check_out_display': format_date(check_out_time, 'M d, Y H:i') if check_out_time else None,
+        'duration': str(checkin.duration).split('.')[0] if checkin.duration else None,
+        'status': checkin.status,
+        'status_display': checkin.get_status_display(),
+    }
+
+
+# Read-only serializers for list endpoints. They produce exactly what the
+# ModelSerializers above produce, but read model attributes directly instead
+# of running every value through bound fields, which dominates the CPU cost
+# of large lists. Times and coordinates go through DRF's own fields.
+_time_field = serializers.TimeField()
+_coordinate_field = serializers.DecimalField(max_digits=9, decimal_places=6)
+
+def _represent(field, value):
+    return None if value is None else field.to_representation(value)
+
+def _datetime(value, tz):
+    # DateTimeField's output, with the current time zone looked up once per list
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+class ReadOnlySerializer:
+    """
+    Supports the read side of the serializer API: Serializer(instance, many=...).data.
+    fields limits the output to those field names, for sparse fieldsets.
+    """
+    # Output field -> the model fields it reads, for only() and select_related()
+    sources = {}
+
+    def __init__(self, instance, many=False, fields=None):
+        self.instance = instance
+        self.many = many
+        self.timezone = timezone.get_current_timezone()
+        self._getters = [
+            (name, getter) for name, getter in self.getters().items()
+            if fields is None or name in fields
+        ]
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(item) for item in self.instance]
+        return self.to_representation(self.instance)
+
+    def getters(self):
+        """Output field -> function of the instance returning its value"""
+        raise NotImplementedError
+
+    def to_representation(self, instance):
+        return {name: getter(instance) for name, getter in self._getters}
+
+class EmployeeReadSerializer(ReadOnlySerializer):
+    """Output of EmployeeSerializer"""
+    sources = {
+        'email': ['email'],
+        'full_name': ['full_name'],
+        'employee_id': ['employee_id'],
+        'role': ['role'],
+        'phone_number': ['phone_number'],
+    }
+
+    def getters(self):
+        return {name: attrgetter(name) for name in self.sources}
+
+class LocationReadSerializer(ReadOnlySerializer):
+    """Output of LocationSerializer"""
+    sources = {
+        'id': ['id'],
+        'name': ['name'],
+        'address': ['address'],
+        'start_time': ['start_time'],
+        'end_time': ['end_time'],
+        'range_meters': ['range_meters'],
+        'latitude': ['latitude'],
+        'longitude': ['longitude'],
+        'is_active': ['is_active'],
+    }
+
+    def getters(self):
+        return {
+            'id': attrgetter('id'),
+            'name': attrgetter('name'),
+            'address': attrgetter('address'),
+            'start_time': lambda location: _represent(_time_field, location.start_time),
+            'end_time': lambda location: _represent(_time_field, location.end_time),
+            'range_meters': attrgetter('range_meters'),
+            'latitude': lambda location: _represent(_coordinate_field, location.latitude),
+            'longitude': lambda location: _represent(_coordinate_field, location.longitude),
+            'is_active': attrgetter('is_active'),
+        }
+
+class CheckInReadSerializer(ReadOnlySerializer):
+    """Output of CheckInSerializer; select_related('employee', 'location') to avoid N+1 queries"""
+    sources = {
+        'id': ['id'],
+        'employee': ['employee'],
+        'employee_name': ['employee__full_name'],
+        'location': ['location'],
+        'location_name': ['location__name'],
+        'check_in_time': ['check_in_time'],
+        'check_out_time': ['check_out_time'],
+        'status': ['status'],
+        'duration': ['duration'],
+        'duration_formatted': ['duration'],
+    }
+
+    def getters(self):
+        tz = self.timezone
+        return {
+            'id': attrgetter('id'),
+            'employee': attrgetter('employee_id'),
+            'employee_name': attrgetter('employee.full_name'),
+            'location': attrgetter('location_id'),
+            'location_name': attrgetter('location.name'),
+            'check_in_time': lambda checkin: _datetime(checkin.check_in_time, tz),
+            'check_out_time': lambda checkin: _datetime(checkin.check_out_time, tz),
+            'status': attrgetter('status'),
+            'duration': lambda checkin: duration_string(checkin.duration) if checkin.duration is not None else None,
+            'duration_formatted': lambda checkin: _format_duration(checkin.duration),
+        }
@@ -0,0 +1,86 @@
+"""
+Check-in and check-out writes shared by the web, mobile and async views.
+
+Each operation runs in one transaction together with its DailyLocationStats
+update, and updates the presence registry once it commits. A partial unique
+constraint allows one open check-in per employee, so concurrent check-ins
+cannot both succeed, and check-out is a single conditional UPDATE, so
+concurrent check-outs cannot both close the same check-in.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Value
+from django.utils import timezone
+
+from .models import CheckIn
+from . import daily_stats, live, presence, timesheets
+
+ALREADY_CHECKED_IN = 'You are already checked in at another location. Please check out first.'
+NOT_CHECKED_IN = 'You are not currently checked in anywhere'
+
+
+class CheckInError(Exception):
+    """A check-in or check-out that conflicts with the employee's current state"""
+
+
+def open_checkin(employee):
+    """The employee's open check-in with its location, or None"""
+    checkin = CheckIn.objects.filter(
+        employee=employee,
+        status='checked_in',
+        check_out_time__isnull=True
+    ).select_related('location').first()
+    if checkin:
+        checkin.employee = employee
+    return checkin
+
+
+def check_in(employee, location, when=None):
+    """Insert an open check-in; raises CheckInError if the employee already has one"""
+    try:
+        with transaction.atomic():
+            checkin = CheckIn.objects.create(
+                employee=employee,
+                location=location,
+                check_in_time=when or timezone.now(),
+                status='checked_in'
+            )
+            daily_stats.record_checkin(checkin)
+    except IntegrityError:
+        # checkin_one_open_per_employee: another request checked in first
+        raise CheckInError(ALREADY_CHECKED_IN)
+    presence.record_checkin(checkin)
+    live.publish_checkin(checkin)
+    return checkin
+
+
+def check_out(checkin, when=None):
+    """
+    Close an open check-in with one UPDATE that only matches while it is still
+    open, computing the duration in the database. Raises CheckInError if
+    another request closed it first. The instance is updated to match the row.
+    """
+    now = timezone.now()
+    when = when or now
+    with transaction.atomic():
+        closed = CheckIn.objects.filter(pk=checkin.pk, check_out_time__isnull=True).update(
+            check_out_time=when,
+            status='checked_out',
+            duration=ExpressionWrapper(
+                Value(when, output_field=DateTimeField()) - F('check_in_time'),
+                output_field=DurationField()
+            ),
+            # The time of the change, which admin sync cursors compare against
+            updated_at=now,
+        )
+        if not closed:
+            raise CheckInError(NOT_CHECKED_IN)
+        checkin.check_out_time = when
+        checkin.status = 'checked_out'
+        checkin.duration = when - checkin.check_in_time
+        checkin.updated_at = now
+        daily_stats.record_checkout(checkin)
+    presence.record_checkout(checkin)
+    live.publish_checkin(checkin)
+    # QuerySet.update() sends no post_save
+    timesheets.record_change(checkin)
+    return checkin
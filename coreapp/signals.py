@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .geo import invalidate_location_grid
+from .models import CheckIn, DeletedRecord, Employee, Location
+from . import archive, presence, timesheets
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def location_changed(sender, **kwargs):
+    invalidate_location_grid()
+
+
+@receiver(post_delete, sender=CheckIn)
+def checkin_deleted(sender, **kwargs):
+    if archive.is_moving():
+        return
+    presence.invalidate()
+
+
+@receiver(post_save, sender=CheckIn)
+@receiver(post_delete, sender=CheckIn)
+def checkin_changed(sender, instance, **kwargs):
+    # Archived rows still count in timesheet reports
+    if archive.is_moving():
+        return
+    timesheets.record_change(instance)
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=CheckIn)
+def record_deletion(sender, instance, **kwargs):
+    if archive.is_moving():
+        return
+    # Lets admin sync clients drop rows deleted since their cursor
+    DeletedRecord.objects.create(model=sender._meta.model_name, object_id=str(instance.pk))
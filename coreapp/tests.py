@@ -1,3 +1,634 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import checkin_batch
+from .checkin_batch import sync_checkin_events
+from .idempotency import idempotent
+from .models import CheckIn, CheckInArchive, DailyLocationStats, DeletedRecord, Employee, Location
+from . import archive, daily_stats, login_pool, presence, services, timesheets
+
+
+def make_location(**fields):
+    return Location.objects.create(**{
+        'name': 'HQ',
+        'address': '1 Main Street',
+        # Check-ins open 15 minutes before the start, so from midnight
+        'start_time': '00:15',
+        'end_time': '23:59',
+        'latitude': '10.000000',
+        'longitude': '10.000000',
+        'range_meters': 100,
+        **fields,
+    })
+
+
+class OneOpenCheckInTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.location = make_location()
+
+    def test_constraint_rejects_second_open_checkin(self):
+        CheckIn.objects.create(employee=self.employee, location=self.location, check_in_time=timezone.now())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CheckIn.objects.create(employee=self.employee, location=self.location, check_in_time=timezone.now())
+
+    def test_double_check_in_raises_checkin_error(self):
+        services.check_in(self.employee, self.location)
+        with self.assertRaisesMessage(services.CheckInError, services.ALREADY_CHECKED_IN):
+            services.check_in(self.employee, make_location(name='Depot'))
+        self.assertEqual(CheckIn.objects.filter(employee=self.employee).count(), 1)
+
+    def test_check_in_allowed_after_check_out(self):
+        services.check_out(services.check_in(self.employee, self.location))
+        services.check_in(self.employee, self.location)
+        self.assertEqual(CheckIn.objects.filter(employee=self.employee, check_out_time__isnull=True).count(), 1)
+
+
+class CheckOutTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.checkin = services.check_in(self.employee, make_location())
+
+    def test_check_out_sets_duration(self):
+        when = self.checkin.check_in_time + timedelta(hours=2)
+        services.check_out(self.checkin, when)
+        self.checkin.refresh_from_db()
+        self.assertEqual(self.checkin.status, 'checked_out')
+        self.assertEqual(self.checkin.duration, timedelta(hours=2))
+
+    def test_lost_race_raises_checkin_error(self):
+        # Another request loaded the same open check-in and closed it first
+        stale = CheckIn.objects.get(pk=self.checkin.pk)
+        first = self.checkin.check_in_time + timedelta(hours=1)
+        services.check_out(self.checkin, first)
+        with self.assertRaisesMessage(services.CheckInError, services.NOT_CHECKED_IN):
+            services.check_out(stale, first + timedelta(hours=1))
+        self.checkin.refresh_from_db()
+        self.assertEqual(self.checkin.check_out_time, first)
+
+
+class CloseDuplicateOpenCheckInsMigrationTests(TransactionTestCase):
+    migrate_from = [('coreapp', '0004_daily_location_stats')]
+    migrate_to = [('coreapp', '0005_checkin_one_open_per_employee')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.old_apps = executor.loader.project_state(self.migrate_from).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        return executor.loader.project_state(self.migrate_to).apps
+
+    def test_keeps_latest_open_and_closes_the_rest(self):
+        Employee = self.old_apps.get_model('coreapp', 'Employee')
+        Location = self.old_apps.get_model('coreapp', 'Location')
+        CheckIn = self.old_apps.get_model('coreapp', 'CheckIn')
+        employee = Employee.objects.create(email='employee@example.com', full_name='Employee', employee_id='EMP000001')
+        other = Employee.objects.create(email='other@example.com', full_name='Other', employee_id='EMP000002')
+        location = Location.objects.create(name='HQ', address='1 Main Street', start_time='00:00', end_time='23:59')
+        start = timezone.now() - timedelta(hours=3)
+        oldest, middle, latest = (
+            CheckIn.objects.create(employee=employee, location=location, check_in_time=start + timedelta(hours=hours))
+            for hours in (0, 1, 2)
+        )
+        untouched = CheckIn.objects.create(employee=other, location=location, check_in_time=start)
+
+        CheckIn = self.migrate().get_model('coreapp', 'CheckIn')
+
+        oldest, middle, latest, untouched = (
+            CheckIn.objects.get(pk=checkin.pk) for checkin in (oldest, middle, latest, untouched)
+        )
+        self.assertEqual(oldest.check_out_time, middle.check_in_time)
+        self.assertEqual(oldest.duration, timedelta(hours=1))
+        self.assertEqual(middle.check_out_time, latest.check_in_time)
+        self.assertEqual(middle.status, 'checked_out')
+        self.assertIsNone(latest.check_out_time)
+        self.assertIsNone(untouched.check_out_time)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CheckIn.objects.create(employee_id=employee.pk, location_id=location.pk, check_in_time=timezone.now())
+
+
+class LoginQueueTests(TestCase):
+    def setUp(self):
+        Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+
+    def tearDown(self):
+        login_pool._reset_executor()
+
+    @override_settings(LOGIN_POOL_WORKERS=0, LOGIN_QUEUE_LIMIT=2, LOGIN_RETRY_AFTER=7)
+    def test_full_queue_answers_429_with_retry_after(self):
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def slow_verify(password, encoded):
+            started.release()
+            release.wait(10)
+            return False, None
+
+        with mock.patch.object(login_pool, '_verify', slow_verify):
+            logins = [threading.Thread(target=login_pool._run, args=('password', 'hash')) for _ in range(2)]
+            for login in logins:
+                login.start()
+            for login in logins:
+                started.acquire(timeout=10)
+            self.assertEqual(login_pool.queue_depth(), 2)
+
+            response = self.client.post(
+                '/api/mobile/login/', {'email': 'employee@example.com', 'password': 'password'},
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '7')
+
+            release.set()
+            for login in logins:
+                login.join(10)
+        self.assertEqual(login_pool.queue_depth(), 0)
+
+    @override_settings(LOGIN_POOL_WORKERS=1, LOGIN_QUEUE_LIMIT=4, LOGIN_TIMEOUT=0.001)
+    def test_timed_out_hash_keeps_its_slot_until_done(self):
+        encoded = Employee.objects.get().password
+        with self.assertRaises(login_pool.LoginQueueFull):
+            login_pool._run('password', encoded)
+        # Released when the hash finishes or is cancelled, not when we stop waiting
+        deadline = time.monotonic() + 30
+        while login_pool.queue_depth() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(login_pool.queue_depth(), 0)
+
+
+@mock.patch('coreapp.presence.shared_cache', return_value=True)
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.location = make_location()
+
+    def test_check_in_and_out_update_only_that_employee(self, shared_cache):
+        other = Employee.objects.create_user('other@example.com', 'Other', 'password')
+        with self.captureOnCommitCallbacks(execute=True):
+            services.check_in(other, self.location)
+        presence.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            checkin = services.check_in(self.employee, self.location)
+        with self.assertNumQueries(0):
+            self.assertEqual(presence.active_checkin_for(self.employee.pk)['id'], checkin.id)
+            self.assertEqual(presence.location_occupancy(), {self.location.id: 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            services.check_out(checkin)
+        with self.assertNumQueries(0):
+            self.assertIsNone(presence.active_checkin_for(self.employee.pk))
+            self.assertEqual([entry['employee'] for entry in presence.checkins_at(self.location.id)], [other.pk])
+            self.assertEqual(presence.checked_in_count(), 1)
+
+    def test_update_that_gives_up_hides_rebuild_in_flight(self, shared_cache):
+        store = cache.set_many
+
+        def set_many_after_lost_update(*args, **kwargs):
+            # A check-in commits after the rebuild read the database, and its
+            # update finds the lock busy
+            CheckIn.objects.create(employee=self.employee, location=self.location, check_in_time=timezone.now())
+            with mock.patch.object(presence, 'LOCK_ATTEMPTS', 0):
+                presence._update(presence._add, {'employee': self.employee.pk, 'location': self.location.id})
+            return store(*args, **kwargs)
+
+        with mock.patch.object(cache, 'set_many', set_many_after_lost_update):
+            snapshot = presence.rebuild()
+        self.assertEqual(snapshot['employees'], {})
+        self.assertIsNotNone(presence.active_checkin_for(self.employee.pk))
+
+    def test_per_process_cache_reads_database(self, shared_cache):
+        shared_cache.return_value = False
+        CheckIn.objects.create(employee=self.employee, location=self.location, check_in_time=timezone.now())
+        presence.rebuild()
+        CheckIn.objects.filter(employee=self.employee).update(check_out_time=timezone.now(), status='checked_out')
+        with self.assertNumQueries(1):
+            self.assertIsNone(presence.active_checkin_for(self.employee.pk))
+
+
+class DailyStatsTests(TestCase):
+    def setUp(self):
+        self.location = make_location()
+
+    def test_live_check_in_records_current_occupancy(self):
+        for number in range(3):
+            employee = Employee.objects.create_user(f'employee{number}@example.com', 'Employee', 'password')
+            services.check_in(employee, self.location)
+        stats = DailyLocationStats.objects.get(location=self.location, date=timezone.localdate())
+        self.assertEqual(stats.checkin_count, 3)
+        self.assertEqual(stats.peak_occupancy, 3)
+
+    def test_late_sync_records_that_days_occupancy(self):
+        for number in range(3):
+            employee = Employee.objects.create_user(f'employee{number}@example.com', 'Employee', 'password')
+            services.check_in(employee, self.location)
+        late = Employee.objects.create_user('late@example.com', 'Late', 'password')
+        start = timezone.now() - timedelta(days=5)
+        results = sync_checkin_events(late, [
+            {'client_id': 'in', 'type': 'check_in', 'location_id': self.location.id,
+             'latitude': '10', 'longitude': '10', 'timestamp': start.isoformat()},
+            {'client_id': 'out', 'type': 'check_out',
+             'latitude': '10', 'longitude': '10', 'timestamp': (start + timedelta(minutes=30)).isoformat()},
+        ])
+        self.assertEqual([result['status'] for result in results], ['accepted', 'accepted'])
+        stats = DailyLocationStats.objects.get(location=self.location, date=timezone.localdate(start))
+        self.assertEqual((stats.checkin_count, stats.checkout_count), (1, 1))
+        self.assertEqual(stats.total_seconds, 30 * 60)
+        self.assertEqual(stats.peak_occupancy, 1)
+
+
+class SyncCheckInEventsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.location = make_location()
+        self.now = timezone.now()
+
+    def event(self, client_id, kind, minutes_ago, latitude='10', **fields):
+        event = {
+            'client_id': client_id,
+            'type': kind,
+            'latitude': latitude,
+            'longitude': '10',
+            'timestamp': (self.now - timedelta(minutes=minutes_ago)).isoformat(),
+            **fields,
+        }
+        if kind == 'check_in':
+            event.setdefault('location_id', self.location.id)
+        return event
+
+    def sync(self, events):
+        with self.captureOnCommitCallbacks(execute=True):
+            return sync_checkin_events(self.employee, events, now=self.now)
+
+    def test_results_in_request_order(self):
+        results = self.sync([
+            self.event('late-out', 'check_out', 10),
+            self.event('far', 'check_in', 40, latitude='10.01'),
+            self.event('in', 'check_in', 30),
+            self.event('future', 'check_in', -10),
+            self.event('old', 'check_in', 8 * 24 * 60),
+            self.event('in', 'check_out', 5),
+            {'client_id': 'bad', 'type': 'bogus'},
+        ])
+        self.assertEqual(
+            [(result['client_id'], result['status']) for result in results],
+            [('late-out', 'accepted'), ('far', 'rejected'), ('in', 'accepted'), ('future', 'rejected'),
+             ('old', 'rejected'), ('in', 'rejected'), ('bad', 'rejected')]
+        )
+        self.assertEqual(results[3]['error'], 'Event timestamp is in the future')
+        self.assertEqual(results[4]['error'], 'Event is too old to be synced')
+        self.assertEqual(results[5]['error'], 'Duplicate client_id in batch')
+        self.assertIn('errors', results[6])
+
+    def test_check_in_and_out_in_one_batch_are_inserted_closed(self):
+        results = self.sync([self.event('out', 'check_out', 10), self.event('in', 'check_in', 70)])
+        checkin = CheckIn.objects.get()
+        self.assertEqual(checkin.status, 'checked_out')
+        self.assertEqual(checkin.duration, timedelta(hours=1))
+        self.assertEqual(results[0]['checkin']['id'], checkin.id)
+        self.assertEqual(results[1]['checkin']['status'], 'checked_out')
+
+    def test_closes_check_in_from_an_earlier_sync(self):
+        self.sync([self.event('in', 'check_in', 30)])
+        self.sync([self.event('out', 'check_out', 10)])
+        checkin = CheckIn.objects.get()
+        self.assertEqual(checkin.status, 'checked_out')
+        self.assertEqual(checkin.duration, timedelta(minutes=20))
+
+    def test_rejects_events_older_than_the_latest_change(self):
+        self.sync([self.event('in', 'check_in', 30)])
+        results = self.sync([self.event('out', 'check_out', 40)])
+        self.assertEqual(results[0]['error'], 'Event is older than your latest check-in or check-out')
+
+    def test_resent_batch_is_reported_as_accepted(self):
+        events = [self.event('in', 'check_in', 30), self.event('out', 'check_out', 10)]
+        self.sync(events)
+        # Later than the resent events, which would otherwise be stale
+        self.sync([self.event('again', 'check_in', 5)])
+        results = self.sync(events)
+        self.assertEqual([result['status'] for result in results], ['accepted', 'accepted'])
+        self.assertEqual(results[1]['checkin']['status'], 'checked_out')
+        self.assertEqual(CheckIn.objects.count(), 2)
+
+    def test_client_ids_are_remembered_per_employee(self):
+        events = [self.event('in', 'check_in', 30)]
+        self.sync(events)
+        other = Employee.objects.create_user('other@example.com', 'Other', 'password')
+        with self.captureOnCommitCallbacks(execute=True):
+            results = sync_checkin_events(other, events, now=self.now)
+        self.assertEqual(results[0]['status'], 'accepted')
+        self.assertEqual(CheckIn.objects.filter(employee=other).count(), 1)
+
+    def test_replays_after_a_concurrent_check_in(self):
+        apply_events = checkin_batch._apply_events
+        calls = []
+
+        def concurrent_check_in(employee, events, results, now):
+            calls.append(now)
+            if len(calls) == 1:
+                # Another request checks in between our read and our insert
+                services.check_in(employee, self.location, now - timedelta(minutes=1))
+                raise IntegrityError('checkin_one_open_per_employee')
+            return apply_events(employee, events, results, now)
+
+        with mock.patch.object(checkin_batch, '_apply_events', concurrent_check_in):
+            results = self.sync([self.event('in', 'check_in', 5)])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(results[0]['status'], 'rejected')
+        self.assertEqual(CheckIn.objects.count(), 1)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.location = make_location()
+        self.client.force_login(self.employee)
+
+    def post(self, url, key, **data):
+        return self.client.post(url, {
+            'location_id': self.location.id, 'latitude': '10', 'longitude': '10', **data,
+        }, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post('/api/mobile/checkin/', 'key-1')
+        self.assertEqual(first.status_code, 200)
+        retry = self.post('/api/mobile/checkin/', 'key-1')
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(CheckIn.objects.count(), 1)
+
+    def test_key_reused_for_a_different_request_is_422(self):
+        self.post('/api/mobile/checkin/', 'key-1')
+        response = self.post('/api/mobile/checkin/', 'key-1', latitude='10.0001')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(CheckIn.objects.count(), 1)
+
+    def test_request_still_in_progress_is_409(self):
+        retries = []
+
+        @idempotent
+        def view(request):
+            # The client retries while the first attempt is still running
+            retries.append(view(request))
+            return JsonResponse({'status': 'success'})
+
+        request = RequestFactory().post('/', {}, content_type='application/json', HTTP_IDEMPOTENCY_KEY='key-1')
+        request.user = self.employee
+        self.assertEqual(view(request).status_code, 200)
+        self.assertEqual(retries[0].status_code, 409)
+
+    def test_keys_are_scoped_to_the_user(self):
+        self.post('/api/mobile/checkin/', 'key-1')
+        self.client.force_login(Employee.objects.create_user('other@example.com', 'Other', 'password'))
+        response = self.post('/api/mobile/checkin/', 'key-1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(CheckIn.objects.count(), 2)
+
+    def test_rejected_mobile_check_in_is_not_stored(self):
+        self.assertEqual(self.post('/api/mobile/checkin/', 'key-1', latitude='20').status_code, 400)
+        response = self.post('/api/mobile/checkin/', 'key-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_rejected_web_check_in_is_not_stored(self):
+        rejected = self.post('/api/check-in/', 'key-1', latitude='20')
+        self.assertEqual(rejected.status_code, 200)
+        self.assertEqual(rejected.json()['status'], 'error')
+        accepted = self.post('/api/check-in/', 'key-1')
+        self.assertEqual(accepted.json()['status'], 'success')
+        self.assertNotIn('Idempotent-Replayed', accepted)
+        self.assertEqual(self.post('/api/check-in/', 'key-1')['Idempotent-Replayed'], 'true')
+        self.assertEqual(CheckIn.objects.count(), 1)
+
+    def test_overlong_key_is_400(self):
+        self.assertEqual(self.post('/api/mobile/checkin/', 'k' * 256).status_code, 400)
+        self.assertEqual(CheckIn.objects.count(), 0)
+
+
+class TimesheetTests(TestCase):
+    # Monday
+    week = date(2026, 9, 7)
+
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.location = make_location()
+
+    def work(self, day, hours, location=None):
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=8))
+        return CheckIn.objects.create(
+            employee=self.employee,
+            location=location or self.location,
+            check_in_time=start,
+            check_out_time=start + timedelta(hours=hours),
+            status='checked_out',
+            duration=timedelta(hours=hours),
+        )
+
+    def report(self, **options):
+        return timesheets.build_report(**{'kind': 'week', 'date_from': self.week, 'date_to': self.week + timedelta(days=13), **options})
+
+    def test_days_are_folded_into_periods_by_location(self):
+        depot = make_location(name='Depot')
+        for offset in range(5):
+            self.work(self.week + timedelta(days=offset), 10)
+        self.work(self.week + timedelta(days=7), 3, location=depot)
+        report = self.report()
+        self.assertEqual(
+            [(period['start'], period['end']) for period in report['periods']],
+            [('2026-09-07', '2026-09-13'), ('2026-09-14', '2026-09-20')]
+        )
+        first, second = (period['employees'][0] for period in report['periods'])
+        self.assertEqual(first['worked_seconds'], 50 * 3600)
+        self.assertEqual([entry['location_name'] for entry in first['locations']], ['HQ'])
+        self.assertEqual(second['worked_seconds'], 3 * 3600)
+        self.assertEqual([entry['location_name'] for entry in second['locations']], ['Depot'])
+
+    def test_overtime_is_the_larger_of_daily_and_period_overtime(self):
+        for offset in range(5):
+            self.work(self.week + timedelta(days=offset), 10)
+        self.work(self.week + timedelta(days=7), 12)
+        first, second = (period['employees'][0] for period in self.report()['periods'])
+        # 2 hours past 8 on each day, and 10 hours past 40 for the week
+        self.assertEqual(first['overtime_seconds'], 10 * 3600)
+        self.assertEqual(first['regular_seconds'], 40 * 3600)
+        # 4 hours past 8 on one day, nothing past 40 for the week
+        self.assertEqual(second['overtime_seconds'], 4 * 3600)
+
+        first = self.report(daily_overtime_hours=11, overtime_hours=45)['periods'][0]['employees'][0]
+        self.assertEqual(first['overtime_seconds'], 5 * 3600)
+
+    def test_open_check_ins_count_until_now(self):
+        CheckIn.objects.create(
+            employee=self.employee, location=self.location,
+            check_in_time=timezone.now() - timedelta(hours=2), status='checked_in'
+        )
+        today = timezone.localdate(timezone.now() - timedelta(hours=2))
+        period = timesheets.build_report('day', today, today)['periods'][0]
+        self.assertFalse(period['finished'])
+        self.assertEqual(period['employees'][0]['open_checkins'], 1)
+        self.assertAlmostEqual(period['employees'][0]['worked_seconds'], 2 * 3600, delta=60)
+
+    def test_finished_periods_are_cached_until_a_change_is_recorded(self):
+        self.work(self.week, 8)
+        self.assertEqual(self.report()['periods'][0]['worked_seconds'], 8 * 3600)
+        # bulk_create sends no post_save, so nothing invalidates the cache
+        late = CheckIn(
+            employee=self.employee, location=self.location,
+            check_in_time=timezone.make_aware(datetime.combine(self.week + timedelta(days=1), datetime.min.time())),
+            status='checked_out', duration=timedelta(hours=2),
+        )
+        late.check_out_time = late.check_in_time + late.duration
+        CheckIn.objects.bulk_create([late])
+        self.assertEqual(self.report()['periods'][0]['worked_seconds'], 8 * 3600)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            timesheets.record_change(late)
+        self.assertEqual(self.report()['periods'][0]['worked_seconds'], 10 * 3600)
+
+    def test_non_finite_hours_are_rejected(self):
+        for value in ('inf', '-inf', 'nan'):
+            with self.assertRaisesMessage(ValueError, 'overtime_hours must be a number of hours'):
+                timesheets.parse_report_params({'overtime_hours': value})
+
+        admin = Employee.objects.create_superuser('admin@example.com', 'Admin', 'password')
+        self.client.force_login(admin)
+        response = self.client.get('/api/mobile/admin/timesheets/', {'overtime_hours': 'inf'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CheckInRecordsPagingTests(TestCase):
+    def setUp(self):
+        self.location = make_location()
+        self.depot = make_location(name='Depot')
+        self.client.force_login(Employee.objects.create_superuser('admin@example.com', 'Admin', 'password'))
+        self.same_time = timezone.now().replace(microsecond=0) - timedelta(days=1)
+        self.checkins = []
+        for number in range(12):
+            employee = Employee.objects.create_user(f'employee{number}@example.com', f'Employee {number}', 'password')
+            # Seven rows share one check_in_time, so pages split inside a tie
+            check_in_time = self.same_time if number < 7 else self.same_time - timedelta(hours=number)
+            self.checkins.append(CheckIn.objects.create(
+                employee=employee,
+                location=self.depot if number % 4 == 3 else self.location,
+                check_in_time=check_in_time,
+                check_out_time=None if number == 11 else check_in_time + timedelta(hours=1),
+                status='checked_in' if number == 11 else 'checked_out',
+            ))
+
+    def walk(self, **params):
+        ids = []
+        cursor = ''
+        while True:
+            response = self.client.get('/api/check-in-records/', {**params, 'page_size': 3, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            self.assertLessEqual(len(data['records']), 3)
+            ids += [record['id'] for record in data['records']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def expected(self, checkins):
+        return [checkin.id for checkin in sorted(checkins, key=lambda checkin: (checkin.check_in_time, checkin.id), reverse=True)]
+
+    def test_walks_every_row_once_across_ties(self):
+        self.assertEqual(self.walk(), self.expected(self.checkins))
+
+    def test_filters_apply_to_every_page(self):
+        ids = self.walk(location=self.location.id, status='checked_out')
+        self.assertEqual(ids, self.expected(
+            checkin for checkin in self.checkins
+            if checkin.location_id == self.location.id and checkin.status == 'checked_out'
+        ))
+        day = timezone.localdate(self.same_time)
+        self.assertEqual(self.walk(date_from=day.isoformat(), date_to=day.isoformat()), self.expected(
+            checkin for checkin in self.checkins if timezone.localdate(checkin.check_in_time) == day
+        ))
+
+    def test_bad_cursor_is_400(self):
+        response = self.client.get('/api/check-in-records/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_monitor_takes_total_from_the_rollup(self):
+        services.check_in(Employee.objects.create_user('live@example.com', 'Live', 'password'), self.location)
+        with self.assertNumQueries(1):
+            self.assertEqual(daily_stats.total_checkins(), 1)
+        response = self.client.get('/admin/check-in-monitor/')
+        self.assertEqual(response.context['total_records'], 1)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create_user('employee@example.com', 'Employee', 'password')
+        self.location = make_location()
+        self.now = timezone.now()
+        self.old = []
+        for days in range(100, 105):
+            start = self.now - timedelta(days=days)
+            self.old.append(CheckIn.objects.create(
+                employee=self.employee, location=self.location, check_in_time=start,
+                check_out_time=start + timedelta(hours=8), status='checked_out', duration=timedelta(hours=8),
+            ))
+        start = self.now - timedelta(days=1)
+        self.recent = CheckIn.objects.create(
+            employee=self.employee, location=self.location, check_in_time=start,
+            check_out_time=start + timedelta(hours=2), status='checked_out', duration=timedelta(hours=2),
+        )
+        self.first_day = timezone.localdate(self.now - timedelta(days=110))
+
+    def stats(self):
+        daily_stats.rebuild(self.first_day, timezone.localdate())
+        return sorted(DailyLocationStats.objects.values_list(
+            'date', 'checkin_count', 'checkout_count', 'total_seconds', 'peak_occupancy'
+        ))
+
+    def report(self):
+        cache.clear()
+        report = timesheets.build_report('month', self.first_day, timezone.localdate())
+        return [period['worked_seconds'] for period in report['periods']]
+
+    def test_moved_rows_leave_checkin_and_still_count_in_reports(self):
+        stats, report = self.stats(), self.report()
+        with self.captureOnCommitCallbacks() as callbacks:
+            moved = archive.archive_batch(self.now - timedelta(days=90), batch_size=3)
+            moved += archive.archive_batch(self.now - timedelta(days=90), batch_size=3)
+        self.assertEqual(moved, 5)
+        self.assertEqual(list(CheckIn.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertEqual(
+            sorted(CheckInArchive.objects.values_list('id', flat=True)), sorted(checkin.id for checkin in self.old)
+        )
+        # A move, so no sync tombstones and no cache invalidation
+        self.assertFalse(DeletedRecord.objects.exists())
+        self.assertEqual(callbacks, [])
+
+        self.assertEqual(self.stats(), stats)
+        self.assertEqual(self.report(), report)
+        rows = archive.combined(lambda checkins: checkins.filter(employee=self.employee).values_list('id', flat=True))
+        self.assertEqual(sorted(rows), sorted([checkin.id for checkin in self.old] + [self.recent.id]))
+
+    def test_deletions_outside_a_move_still_send_signals(self):
+        archive.archive_batch(self.now - timedelta(days=90))
+        self.assertFalse(archive.is_moving())
+        recent_id = self.recent.id
+        self.recent.delete()
+        self.assertTrue(DeletedRecord.objects.filter(model='checkin', object_id=str(recent_id)).exists())
@@ -0,0 +1,321 @@
+"""
+Timesheet reports: worked time per employee and period (day, week, month or
+pay period), broken down by location, with overtime.
+
+One grouped query over hot and archived check-ins sums each employee's worked
+time per location and local day, with open check-ins counted up to now; the
+days are then folded into periods here. Time is credited to the day a
+check-in started, as in the daily rollup.
+
+A period's overtime is the greater of the time worked past the daily
+threshold, summed over its days, and the time worked past the period
+threshold, so no hour counts twice.
+
+Finished periods (ended before today, with no open check-ins) are cached.
+Every check-in write changes a version stamp for the month it started in,
+and cache keys include the stamps of the months a period covers, so edits,
+deletions and late offline syncs only invalidate the periods they touch.
+"""
+import math
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DateTimeField, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .filters import day_range
+from .models import Employee, Location
+from . import archive
+
+PERIODS = ('day', 'week', 'month', 'pay_period')
+MAX_REPORT_DAYS = 366
+
+VERSION_KEY = 'coreapp:timesheet-version:{:%Y-%m}'
+PERIOD_KEY = 'coreapp:timesheet:{kind}:{start}:{end}:{employee}:{location}:{versions}'
+
+
+def overtime_thresholds():
+    """Hours after which worked time is overtime, per day and per period kind (None for no limit)"""
+    return {
+        'day': 8,
+        'week': 40,
+        'month': None,
+        'pay_period': 80,
+        **getattr(settings, 'TIMESHEET_OVERTIME_HOURS', {}),
+    }
+
+
+def pay_period_start(day):
+    anchor = getattr(settings, 'PAY_PERIOD_START', date(2024, 1, 1))
+    length = getattr(settings, 'PAY_PERIOD_DAYS', 14)
+    return day - timedelta(days=(day - anchor).days % length)
+
+
+def period_bounds(kind, day):
+    """The first and last day of the period of the given kind containing day"""
+    if kind == 'day':
+        return day, day
+    if kind == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if kind == 'month':
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    start = pay_period_start(day)
+    return start, start + timedelta(days=getattr(settings, 'PAY_PERIOD_DAYS', 14) - 1)
+
+
+def split_periods(kind, date_from, date_to):
+    """(start, end) of every period overlapping the range, clipped to it"""
+    periods = []
+    day = date_from
+    while day <= date_to:
+        end = min(period_bounds(kind, day)[1], date_to)
+        periods.append((day, end))
+        day = end + timedelta(days=1)
+    return periods
+
+
+def record_change(checkin):
+    """Invalidate the cached periods covering a check-in once the transaction commits"""
+    key = VERSION_KEY.format(timezone.localdate(checkin.check_in_time))
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+
+def _versions(date_from, date_to):
+    """Version stamp of every month in the range, keyed by its first day"""
+    months = []
+    month = date_from.replace(day=1)
+    while month <= date_to:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    keys = {VERSION_KEY.format(month): month for month in months}
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # Never changed, or evicted: start a stamp no cached period uses
+            cache.add(key, time.time_ns(), None)
+            stamps[key] = cache.get(key)
+    return {month: stamps[key] for key, month in keys.items()}
+
+
+def _period_key(kind, start, end, employee, location, versions):
+    stamps = '-'.join(
+        str(stamp) for month, stamp in versions.items()
+        if start.replace(day=1) <= month <= end
+    )
+    return PERIOD_KEY.format(
+        kind=kind, start=start, end=end, employee=employee or '', location=location or '', versions=stamps
+    )
+
+
+def _worked_days(checkins, date_from, date_to, employee=None, location=None):
+    """Worked time and open check-ins per employee, location and local day"""
+    start, _ = day_range(date_from)
+    _, end = day_range(date_to)
+    # Closed check-ins have their duration stored; open ones run until now
+    worked = Coalesce('duration', ExpressionWrapper(
+        Value(timezone.now(), output_field=DateTimeField()) - F('check_in_time'),
+        output_field=DurationField()
+    ))
+    checkins = checkins.filter(check_in_time__gte=start, check_in_time__lt=end)
+    if employee:
+        checkins = checkins.filter(Q(employee__email=employee) | Q(employee__employee_id=employee))
+    if location:
+        checkins = checkins.filter(location_id=location)
+    return checkins.annotate(
+        day=TruncDate('check_in_time')
+    ).values('employee_id', 'location_id', 'day').annotate(
+        worked=Sum(worked),
+        open_checkins=Count('id', filter=Q(check_out_time__isnull=True)),
+    ).order_by()
+
+
+def _fold(rows, periods):
+    """
+    Fold day rows into the given periods:
+    {(start, end): {employee: {'locations': {id: seconds}, 'days': {day: seconds}, 'open': n}}}
+    """
+    period_of = {}
+    for start, end in periods:
+        for offset in range((end - start).days + 1):
+            period_of[start + timedelta(days=offset)] = (start, end)
+    folded = {period: {} for period in periods}
+    for row in rows:
+        period = period_of.get(row['day'])
+        if period is None:
+            continue
+        totals = folded[period].setdefault(
+            row['employee_id'], {'locations': defaultdict(int), 'days': defaultdict(int), 'open': 0}
+        )
+        seconds = int(row['worked'].total_seconds())
+        totals['locations'][row['location_id']] += seconds
+        totals['days'][row['day']] += seconds
+        totals['open'] += row['open_checkins']
+    # Plain dicts, so the cached values stay small
+    for employees in folded.values():
+        for totals in employees.values():
+            totals['locations'] = dict(totals['locations'])
+            totals['days'] = dict(totals['days'])
+    return folded
+
+
+def _overtime(totals, worked, daily_limit, period_limit):
+    overtime = 0
+    if daily_limit is not None:
+        overtime = sum(max(0, seconds - daily_limit) for seconds in totals['days'].values())
+    if period_limit is not None:
+        overtime = max(overtime, worked - period_limit)
+    return overtime
+
+
+def _hours_to_seconds(hours):
+    return None if hours is None else int(float(hours) * 3600)
+
+
+def build_report(kind='week', date_from=None, date_to=None, employee=None, location=None,
+                 daily_overtime_hours=None, overtime_hours=None):
+    """
+    The timesheet for a date range (inclusive), as JSON-ready data. Overtime
+    thresholds default to TIMESHEET_OVERTIME_HOURS.
+    """
+    today = timezone.localdate()
+    date_to = date_to or today
+    date_from = date_from or date_to.replace(day=1)
+    thresholds = overtime_thresholds()
+    if daily_overtime_hours is None:
+        daily_overtime_hours = thresholds['day']
+    if overtime_hours is None:
+        overtime_hours = thresholds[kind]
+    daily_limit = _hours_to_seconds(daily_overtime_hours)
+    period_limit = _hours_to_seconds(overtime_hours)
+
+    periods = split_periods(kind, date_from, date_to)
+    versions = _versions(date_from, date_to)
+    keys = {
+        period: _period_key(kind, *period, employee, location, versions)
+        for period in periods if period[1] < today
+    }
+    cached = cache.get_many(keys.values())
+    folded = {period: cached[key] for period, key in keys.items() if key in cached}
+
+    missing = [period for period in periods if period not in folded]
+    if missing:
+        # Hot and archived check-ins in one grouped query
+        rows = archive.combined(
+            lambda checkins: _worked_days(checkins, missing[0][0], missing[-1][1], employee, location)
+        )
+        fresh = _fold(rows, missing)
+        folded.update(fresh)
+        cache.set_many({
+            keys[period]: employees for period, employees in fresh.items()
+            if period in keys and not any(totals['open'] for totals in employees.values())
+        }, getattr(settings, 'TIMESHEET_CACHE_TIMEOUT', 24 * 60 * 60))
+
+    employee_names = {
+        email: (full_name, employee_id)
+        for email, full_name, employee_id in Employee.objects.values_list('email', 'full_name', 'employee_id')
+    }
+    location_names = dict(Location.objects.values_list('id', 'name'))
+
+    report = []
+    for start, end in periods:
+        rows = []
+        for email, totals in folded[(start, end)].items():
+            worked = sum(totals['locations'].values())
+            overtime = _overtime(totals, worked, daily_limit, period_limit)
+            full_name, employee_id = employee_names.get(email, ('', ''))
+            rows.append({
+                'employee': email,
+                'employee_name': full_name,
+                'employee_id': employee_id,
+                'worked_seconds': worked,
+                'regular_seconds': worked - overtime,
+                'overtime_seconds': overtime,
+                'open_checkins': totals['open'],
+                'locations': sorted((
+                    {'location': location_id, 'location_name': location_names.get(location_id, ''), 'worked_seconds': seconds}
+                    for location_id, seconds in totals['locations'].items()
+                ), key=lambda entry: entry['location_name']),
+            })
+        rows.sort(key=lambda row: (row['employee_name'], row['employee']))
+        report.append({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'finished': end < today,
+            'worked_seconds': sum(row['worked_seconds'] for row in rows),
+            'overtime_seconds': sum(row['overtime_seconds'] for row in rows),
+            'employees': rows,
+        })
+
+    return {
+        'period': kind,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'overtime_thresholds': {'daily_hours': daily_overtime_hours, 'period_hours': overtime_hours},
+        'periods': report,
+    }
+
+
+def _parse_day(value, name):
+    day = None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        pass
+    if day is None:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+    return day
+
+
+def _parse_hours(value, name):
+    try:
+        hours = float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number of hours')
+    if not math.isfinite(hours):
+        raise ValueError(f'{name} must be a number of hours')
+    if hours < 0:
+        raise ValueError(f'{name} cannot be negative')
+    return hours
+
+
+def parse_report_params(params):
+    """
+    build_report() arguments from a query dict: period, date_from, date_to,
+    employee, location, daily_overtime_hours and overtime_hours.
+    Raises ValueError for malformed values.
+    """
+    kind = params.get('period') or 'week'
+    if kind not in PERIODS:
+        raise ValueError(f'period must be one of: {", ".join(PERIODS)}')
+    options = {'kind': kind, 'employee': params.get('employee') or None}
+
+    if params.get('date_from'):
+        options['date_from'] = _parse_day(params['date_from'], 'date_from')
+    if params.get('date_to'):
+        options['date_to'] = _parse_day(params['date_to'], 'date_to')
+    date_to = options.get('date_to') or timezone.localdate()
+    date_from = options.get('date_from') or date_to.replace(day=1)
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    if (date_to - date_from).days >= MAX_REPORT_DAYS:
+        raise ValueError(f'Reports cover at most {MAX_REPORT_DAYS} days')
+
+    if params.get('location'):
+        try:
+            options['location'] = int(params['location'])
+        except ValueError:
+            raise ValueError('location must be a location id')
+
+    for name in ('daily_overtime_hours', 'overtime_hours'):
+        if params.get(name):
+            options[name] = _parse_hours(params[name], name)
+    return options
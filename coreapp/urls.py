@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from . import api_views
+from . import async_api_views
+
+# Native async versions of the busiest mobile endpoints, for ASGI deployments
+mobile_views = async_api_views if settings.ASYNC_MOBILE_API else api_views
 
 # app_name = 'coreapp'
 
@@ -18,17 +23,24 @@ urlpatterns = [
     path('api/mobile/login/', api_views.api_login, name='api_login'),
     path('api/mobile/logout/', api_views.api_logout, name='api_logout'),
     path('api/mobile/profile/', api_views.api_profile, name='api_profile'),
-    path('api/mobile/locations/', api_views.api_locations, name='api_locations'),
-    path('api/mobile/active-checkin/', api_views.api_active_checkin, name='api_active_checkin'),
-    path('api/mobile/checkin-history/', api_views.api_checkin_history, name='api_checkin_history'),
-    path('api/mobile/checkin/', api_views.api_checkin, name='api_mobile_checkin'),
-    path('api/mobile/checkout/', api_views.api_checkout, name='api_mobile_checkout'),
+    path('api/mobile/bootstrap/', api_views.api_bootstrap, name='api_bootstrap'),
+    path('api/mobile/locations/', mobile_views.api_locations, name='api_locations'),
+    path('api/mobile/locations/nearby/', api_views.api_nearby_locations, name='api_nearby_locations'),
+    path('api/mobile/active-checkin/', mobile_views.api_active_checkin, name='api_active_checkin'),
+    path('api/mobile/checkin-history/', mobile_views.api_checkin_history, name='api_checkin_history'),
+    path('api/mobile/checkin/', mobile_views.api_checkin, name='api_mobile_checkin'),
+    path('api/mobile/checkout/', mobile_views.api_checkout, name='api_mobile_checkout'),
+    path('api/mobile/checkins/sync/', api_views.api_sync_checkins, name='api_sync_checkins'),
     
     # Admin mobile API endpoints
     path('api/mobile/admin/dashboard-stats/', api_views.api_admin_dashboard_stats, name='api_admin_dashboard_stats'),
     path('api/mobile/admin/checkins/', api_views.api_admin_all_checkins, name='api_admin_all_checkins'),
     path('api/mobile/admin/employees/', api_views.api_admin_employees, name='api_admin_employees'),
     path('api/mobile/admin/locations/', api_views.api_admin_locations, name='api_admin_locations'),
+    path('api/mobile/admin/bootstrap/', api_views.api_admin_bootstrap, name='api_admin_bootstrap'),
+    path('api/mobile/admin/sync/', api_views.api_admin_sync, name='api_admin_sync'),
+    path('api/mobile/admin/live/', async_api_views.api_admin_live, name='api_admin_live'),
+    path('api/mobile/admin/timesheets/', api_views.api_admin_timesheets, name='api_admin_timesheets'),
     
     # Admin dashboard tab views
     path('admin/locations/', views.admin_locations, name='admin_locations'),
@@ -36,6 +48,7 @@ urlpatterns = [
     path('admin/active-locations/', views.admin_active_locations, name='admin_active_locations'),
     path('admin/check-in-log/', views.admin_checkin_log, name='admin_checkin_log'),
     path('admin/check-in-monitor/', views.admin_checkin_monitor, name='admin_checkin_monitor'),
+    path('admin/timesheets/', views.admin_timesheets, name='admin_timesheets'),
     
     # API endpoints for employee actions
     path('api/check-in/', views.employee_checkin, name='employee_checkin'),
@@ -48,4 +61,8 @@ urlpatterns = [
     path('api/add-employee/', views.add_employee, name='add_employee'),
     path('api/edit-employee/<str:employee_id>/', views.edit_employee, name='edit_employee'),
     path('api/export-check-in-data/', views.export_checkin_data, name='export_checkin_data'),
+    path('api/check-in-records/', views.admin_checkin_records, name='admin_checkin_records'),
+    
+    # Prometheus metrics, for staff or scrapers on localhost
+    path('metrics', views.metrics_view, name='metrics'),
 ] 
\ No newline at end of file
@@ -1,16 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.utils import timezone
-from django.db.models import Sum, Count, F, ExpressionWrapper, fields
-from django.db.models.functions import TruncDate
+from django.db.models import Exists, OuterRef
+from django.conf import settings
 
+import csv
 import json
+import zlib
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from .models import Employee, Location, CheckIn
+from .authentication import revoke_tokens
+from .filters import filter_checkins
+from .idempotency import idempotent, json_status_success
+from .login_pool import LoginQueueFull, authenticate_login
+from .pagination import paginate_checkins, parse_page_size
+from .serializers import checkin_record
+from . import archive, daily_stats, metrics, presence, services, timesheets
 
 @login_required(login_url='/login/')
 def home(request):
@@ -24,7 +34,12 @@ def login_view(request):
     if request.method == 'POST':
         email = request.POST.get('email')
         password = request.POST.get('password')
-        user = authenticate(request, email=email, password=password)
+        try:
+            user = authenticate_login(email, password)
+        except LoginQueueFull as e:
+            response = render(request, 'login.html', {'error': str(e)}, status=429)
+            response['Retry-After'] = str(e.retry_after)
+            return response
         
         if user is not None:
             login(request, user)
@@ -76,6 +91,13 @@ def admin_dashboard(request):
     # Default to locations tab
     return admin_locations(request)
 
+def _locations_with_activity():
+    # The locations grid, rendered on every admin tab, flags locations that
+    # have never been checked in to; annotate that instead of a query per card
+    return Location.objects.annotate(
+        has_checkins=Exists(CheckIn.objects.filter(location=OuterRef('pk')))
+    )
+
 # Admin Dashboard tab views
 @login_required(login_url='/login/')
 def admin_locations(request):
@@ -83,7 +105,7 @@ def admin_locations(request):
         return redirect('employee_dashboard')
     
     # Get all locations
-    locations = Location.objects.all()
+    locations = _locations_with_activity()
     
     context = {
         'active_tab': 'locations',
@@ -112,64 +134,60 @@ def admin_checkin_monitor(request):
     if not request.user.is_staff:
         return redirect('employee_dashboard')
     
-    # Get check-in statistics
-    today = timezone.now().date()
-    
     # Currently checked in employees count
-    currently_checked_in = CheckIn.objects.filter(
-        status='checked_in',
-        check_out_time__isnull=True
-    ).count()
-    
-    # Today's check-ins count
-    todays_checkins = CheckIn.objects.filter(
-        check_in_time__date=today
-    ).count()
-    
-    # Total hours today
-    total_hours = CheckIn.objects.filter(
-        check_in_time__date=today,
-        check_out_time__isnull=False
-    ).aggregate(
-        total_duration=Sum('duration')
-    )['total_duration'] or timedelta()
-    
-    # Format total hours
-    total_hours_str = f"{total_hours.seconds // 3600}h {(total_hours.seconds % 3600) // 60}m"
+    currently_checked_in = presence.checked_in_count()
     
-    # All check-in records
-    checkin_records = CheckIn.objects.all().select_related('employee', 'location')
+    # Today's check-ins and hours, from the daily rollup
+    todays_totals = daily_stats.totals_for(timezone.localdate())
+    todays_checkins = todays_totals['checkins']
+    total_hours_str = _format_hours(timedelta(seconds=todays_totals['seconds']))
     
     # Get locations for dropdown filter
-    locations = Location.objects.all()
+    locations = _locations_with_activity()
     
+    # Check-in records are paged in by the browser from admin_checkin_records
     context = {
         'active_tab': 'check-in-monitor',
         'currently_checked_in': currently_checked_in,
         'todays_checkins': todays_checkins,
         'total_hours_str': total_hours_str,
-        'total_records': CheckIn.objects.count(),
-        'checkin_records': checkin_records,
+        # From the rollup rather than a full-table count
+        'total_records': daily_stats.total_checkins(),
         'locations': locations,
     }
     
     return render(request, 'admin-dashboard.html', context)
 
+def _format_hours(duration):
+    total_seconds = int(duration.total_seconds())
+    return f"{total_seconds // 3600}h {(total_seconds % 3600) // 60}m"
+
 @login_required(login_url='/login/')
 def admin_active_locations(request):
     if not request.user.is_staff:
         return redirect('employee_dashboard')
     
     # Get all locations
-    locations = Location.objects.all()
+    locations = list(_locations_with_activity())
+    
+    # Get every open check-in in one query and group them by location,
+    # longest stay first
+    open_checkins = CheckIn.objects.filter(
+        status='checked_in',
+        check_out_time__isnull=True
+    ).select_related('employee').order_by('check_in_time')
     
-    # Get currently checked in employees for each location
+    checkins_by_location = defaultdict(list)
+    for checkin in open_checkins:
+        checkins_by_location[checkin.location_id].append(checkin)
+    
+    now = timezone.now()
     for location in locations:
-        location.active_checkins = CheckIn.objects.filter(
-            location=location,
-            status='checked_in',
-            check_out_time__isnull=True
-        ).select_related('employee')
+        location.active_checkins = checkins_by_location.get(location.id, [])
+        location.headcount = len(location.active_checkins)
+        if location.active_checkins:
+            longest_stay = now - location.active_checkins[0].check_in_time
+            location.longest_stay_str = _format_hours(longest_stay)
     
     context = {
         'active_tab': 'active-locations',
@@ -183,23 +201,83 @@ def admin_checkin_log(request):
     if not request.user.is_staff:
         return redirect('employee_dashboard')
     
-    # Get all check-in records
-    checkin_records = CheckIn.objects.all().select_related('employee', 'location').order_by('-check_in_time')
-    
     # Get all locations for filtering
-    locations = Location.objects.all()
+    locations = _locations_with_activity()
     
+    # Check-in records are paged in by the browser from admin_checkin_records
     context = {
         'active_tab': 'check-in-log',
-        'checkin_records': checkin_records,
         'locations': locations,
     }
     
     return render(request, 'admin-dashboard.html', context)
 
+@login_required(login_url='/login/')
+def admin_timesheets(request):
+    if not request.user.is_staff:
+        return redirect('employee_dashboard')
+    
+    # Get all locations for filtering
+    locations = _locations_with_activity()
+    
+    context = {
+        'active_tab': 'timesheets',
+        'locations': locations,
+        'timesheet_periods': timesheets.PERIODS,
+    }
+    
+    try:
+        report = timesheets.build_report(**timesheets.parse_report_params(request.GET))
+    except ValueError as e:
+        context['timesheet_error'] = str(e)
+        return render(request, 'admin-dashboard.html', context)
+    
+    # Hours for display
+    for period in report['periods']:
+        period['worked_str'] = _format_hours(timedelta(seconds=period['worked_seconds']))
+        period['overtime_str'] = _format_hours(timedelta(seconds=period['overtime_seconds']))
+        for row in period['employees']:
+            row['worked_str'] = _format_hours(timedelta(seconds=row['worked_seconds']))
+            row['overtime_str'] = _format_hours(timedelta(seconds=row['overtime_seconds']))
+            for entry in row['locations']:
+                entry['worked_str'] = _format_hours(timedelta(seconds=entry['worked_seconds']))
+    
+    context['timesheet'] = report
+    context['timesheet_location'] = request.GET.get('location', '')
+    return render(request, 'admin-dashboard.html', context)
+
+@login_required(login_url='/login/')
+def admin_checkin_records(request):
+    """
+    One page of check-in records for the admin log and monitor tabs,
+    filtered on the server and paged with a (check_in_time, id) cursor.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+    
+    try:
+        page_size = parse_page_size(request.GET.get('page_size'))
+        checkins = filter_checkins(
+            CheckIn.objects.select_related('employee', 'location'),
+            request.GET
+        )
+        records, next_cursor = paginate_checkins(checkins, request.GET.get('cursor'), page_size)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    return JsonResponse({
+        'status': 'success',
+        'records': [checkin_record(checkin) for checkin in records],
+        'next_cursor': next_cursor,
+    })
+
+def _idempotency_error(message, status):
+    return JsonResponse({'status': 'error', 'message': message}, status=status)
+
 # API endpoints for employee check-in/check-out
 @csrf_exempt
 @login_required(login_url='/login/')
+@idempotent(error=_idempotency_error, store=json_status_success)
 def employee_checkin(request):
     if request.method == 'POST':
         try:
@@ -211,19 +289,6 @@ def employee_checkin(request):
             # Check if location exists
             location = get_object_or_404(Location, id=location_id)
             
-            # Check if employee is already checked in somewhere
-            active_checkin = CheckIn.objects.filter(
-                employee=request.user,
-                status='checked_in',
-                check_out_time__isnull=True
-            ).first()
-            
-            if active_checkin:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'You are already checked in at another location. Please check out first.'
-                })
-            
             # Check if employee can check in (15 minutes before shift start)
             current_time = timezone.localtime().time()
             if not location.can_check_in(current_time):
@@ -245,13 +310,8 @@ def employee_checkin(request):
                     'message': f'You are not within range of this location. Please move closer to {location.name}'
                 })
             
-            # Create check-in record
-            checkin = CheckIn.objects.create(
-                employee=request.user,
-                location=location,
-                check_in_time=timezone.now(),
-                status='checked_in'
-            )
+            # Create check-in record; fails if the employee is already checked in somewhere
+            checkin = services.check_in(request.user, location)
             
             return JsonResponse({
                 'status': 'success', 
@@ -259,6 +319,8 @@ def employee_checkin(request):
                 'timestamp': timezone.localtime().strftime('%H:%M:%S'),
                 'checkin_id': checkin.id
             })
+        except services.CheckInError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)})
     
@@ -266,6 +328,7 @@ def employee_checkin(request):
 
 @csrf_exempt
 @login_required(login_url='/login/')
+@idempotent(error=_idempotency_error, store=json_status_success)
 def employee_checkout(request):
     if request.method == 'POST':
         try:
@@ -274,16 +337,12 @@ def employee_checkout(request):
             user_longitude = data.get('longitude')
             
             # Find active check-in for this employee
-            active_checkin = CheckIn.objects.filter(
-                employee=request.user,
-                status='checked_in',
-                check_out_time__isnull=True
-            ).first()
+            active_checkin = services.open_checkin(request.user)
             
             if not active_checkin:
                 return JsonResponse({
                     'status': 'error',
-                    'message': 'You are not currently checked in anywhere'
+                    'message': services.NOT_CHECKED_IN
                 })
                 
             # Check if employee is within range of the location
@@ -300,17 +359,17 @@ def employee_checkout(request):
                     'message': f'You are not within range of this location. Please move closer to {location.name} to check out'
                 })
             
-            # Update check-in record
-            active_checkin.check_out_time = timezone.now()
-            active_checkin.status = 'checked_out'
-            active_checkin.save()  # Duration is calculated in the save method
+            # Close the check-in; fails if another request checked out first
+            services.check_out(active_checkin)
             
             return JsonResponse({
                 'status': 'success', 
-                'message': f'Successfully checked out from {active_checkin.location.name}',
+                'message': f'Successfully checked out from {location.name}',
                 'timestamp': timezone.localtime().strftime('%H:%M:%S'),
                 'duration': str(active_checkin.duration).split('.')[0]  # Format as HH:MM:SS
             })
+        except services.CheckInError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)})
     
@@ -406,38 +465,79 @@ def add_employee(request):
             
     return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
 
+# Rows are read from the database and written to the client in chunks of this size
+EXPORT_CHUNK_SIZE = 2000
+
+class _Echo:
+    """File-like object that returns what is written, so csv.writer can feed a stream"""
+    def write(self, value):
+        return value
+
+def _export_values(checkins):
+    return checkins.values_list(
+        'employee__full_name', 'employee__email', 'location__name',
+        'check_in_time', 'check_out_time', 'duration', 'status'
+    )
+
+def _export_csv_chunks(rows):
+    writer = csv.writer(_Echo())
+    status_display = dict(CheckIn.STATUS_CHOICES)
+    
+    yield writer.writerow(['Employee', 'Email', 'Location', 'Check In Time', 'Check Out Time', 'Duration', 'Status'])
+    
+    chunk = []
+    for name, email, location_name, check_in_time, check_out_time, duration, status in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk.append(writer.writerow([
+            name,
+            email,
+            location_name,
+            check_in_time.strftime('%Y-%m-%d %H:%M:%S'),
+            check_out_time.strftime('%Y-%m-%d %H:%M:%S') if check_out_time else 'N/A',
+            str(duration).split('.')[0] if duration else 'N/A',  # Format as HH:MM:SS
+            status_display.get(status, status)
+        ]))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
 @csrf_exempt
 @login_required(login_url='/login/')
 def export_checkin_data(request):
+    """
+    Stream check-in records as CSV. Accepts the same filters as the check-in log
+    (location, status, employee, search, date_from, date_to), gzip=1 to
+    compress the download and archived=1 to include archived check-ins.
+    """
     if not request.user.is_staff:
         return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
     
-    import csv
-    from django.http import HttpResponse
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="checkin_data.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Employee', 'Email', 'Location', 'Check In Time', 'Check Out Time', 'Duration', 'Status'])
-    
-    # Get all check-in records
-    checkins = CheckIn.objects.all().select_related('employee', 'location')
-    
-    # Write data rows
-    for checkin in checkins:
-        writer.writerow([
-            checkin.employee.full_name,
-            checkin.employee.email,
-            checkin.location.name,
-            checkin.check_in_time.strftime('%Y-%m-%d %H:%M:%S'),
-            checkin.check_out_time.strftime('%Y-%m-%d %H:%M:%S') if checkin.check_out_time else 'N/A',
-            str(checkin.duration).split('.')[0] if checkin.duration else 'N/A',  # Format as HH:MM:SS
-            checkin.get_status_display()
-        ])
-    
+    try:
+        if request.GET.get('archived') in ('1', 'true'):
+            rows = archive.combined(
+                lambda checkins: _export_values(filter_checkins(checkins, request.GET))
+            ).order_by('-check_in_time')
+        else:
+            rows = _export_values(filter_checkins(CheckIn.objects.all(), request.GET).order_by('-check_in_time', '-id'))
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    chunks = _export_csv_chunks(rows)
+    if request.GET.get('gzip') in ('1', 'true'):
+        response = StreamingHttpResponse(_gzip_chunks(chunks), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="checkin_data.csv.gz"'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="checkin_data.csv"'
     return response
 
 @csrf_exempt
@@ -450,8 +550,9 @@ def delete_location(request, location_id):
         try:
             location = get_object_or_404(Location, id=location_id)
             
-            # Check if there are any check-ins associated with this location
-            if location.check_ins.exists():
+            # Check if there are any check-ins associated with this location,
+            # including ones moved to the archive
+            if location.check_ins.exists() or location.archived_check_ins.exists():
                 return JsonResponse({
                     'status': 'error',
                     'message': 'Cannot delete location with existing check-in records'
@@ -570,6 +671,10 @@ def edit_employee(request, employee_id):
             
             employee.save()
             
+            # Sign the employee out of the mobile app
+            if password:
+                revoke_tokens(employee)
+            
             return JsonResponse({
                 'status': 'success',
                 'message': 'Employee updated successfully'
@@ -577,4 +682,12 @@ def edit_employee(request, employee_id):
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)})
     
-    return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': 'Method not allowed'}, status=405)
+
+def metrics_view(request):
+    # Staff, or a Prometheus scraper at one of METRICS_ALLOWED_IPS
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in allowed_ips):
+        return HttpResponseForbidden()
+    
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
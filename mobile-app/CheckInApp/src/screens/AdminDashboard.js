@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   View,
   Text,
@@ -13,6 +13,14 @@ import { Ionicons } from '@expo/vector-icons';
 import { useAuth } from '../context/AuthContext';
 import { apiService } from '../services/apiService';
 
+const RECENT_CHECKINS = 50;
+
+// Drop deleted rows, then replace or add changed ones by key
+const mergeRows = (rows, changed, deleted, key) => {
+  const removed = new Set([...deleted, ...changed.map((row) => row[key])]);
+  return [...changed, ...rows.filter((row) => !removed.has(row[key]))];
+};
+
 const AdminDashboard = () => {
   const { user, logout } = useAuth();
   const [stats, setStats] = useState({});
@@ -22,24 +30,55 @@ const AdminDashboard = () => {
   const [activeTab, setActiveTab] = useState('overview');
   const [isLoading, setIsLoading] = useState(true);
   const [isRefreshing, setIsRefreshing] = useState(false);
+  // Admin sync cursor from the last successful load
+  const cursor = useRef(null);
 
   useEffect(() => {
     loadData();
   }, []);
 
+  // Live counters and check-ins pushed by the server
+  useEffect(() => {
+    const unsubscribe = apiService.subscribeAdminEvents((type, data) => {
+      if (type === 'stats') {
+        setStats((current) => ({ ...current, ...data }));
+      } else if (type === 'check_in' || type === 'check_out') {
+        setStats((current) => ({ ...current, ...data.stats }));
+        setCheckIns((rows) =>
+          mergeRows(rows, [data.checkin], [], 'id')
+            .sort((a, b) => new Date(b.check_in_time) - new Date(a.check_in_time))
+            .slice(0, RECENT_CHECKINS)
+        );
+      } else if (type === 'resync') {
+        loadData();
+      }
+    });
+    return unsubscribe;
+  }, []);
+
   const loadData = async () => {
     try {
-      const [statsData, checkInsData, employeesData, locationsData] = await Promise.all([
-        apiService.getAdminDashboardStats(),
-        apiService.getAdminCheckIns(),
-        apiService.getAdminEmployees(),
-        apiService.getAdminLocations(),
-      ]);
+      // Everything in one request the first time, then only changed rows
+      const changes = cursor.current
+        ? await apiService.getAdminSync(cursor.current)
+        : await apiService.getAdminBootstrap();
+      const { deleted } = changes;
       
-      setStats(statsData);
-      setCheckIns(checkInsData);
-      setEmployees(employeesData);
-      setLocations(locationsData);
+      setStats(changes.stats);
+      if (changes.full) {
+        setCheckIns(changes.checkins);
+        setEmployees(changes.employees);
+        setLocations(changes.locations);
+      } else {
+        setCheckIns((rows) =>
+          mergeRows(rows, changes.checkins, deleted.checkins, 'id')
+            .sort((a, b) => new Date(b.check_in_time) - new Date(a.check_in_time))
+            .slice(0, RECENT_CHECKINS)
+        );
+        setEmployees((rows) => mergeRows(rows, changes.employees, deleted.employees, 'email'));
+        setLocations((rows) => mergeRows(rows, changes.locations, deleted.locations, 'id'));
+      }
+      cursor.current = changes.cursor;
     } catch (error) {
       console.error('Error loading admin data:', error);
     } finally {
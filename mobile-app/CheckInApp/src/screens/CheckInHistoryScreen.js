@@ -14,6 +14,8 @@ const CheckInHistoryScreen = () => {
   const [history, setHistory] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [isRefreshing, setIsRefreshing] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   useEffect(() => {
     loadHistory();
@@ -22,7 +24,8 @@ const CheckInHistoryScreen = () => {
   const loadHistory = async () => {
     try {
       const data = await apiService.getCheckInHistory();
-      setHistory(data);
+      setHistory(data.results);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Error loading history:', error);
     } finally {
@@ -30,6 +33,23 @@ const CheckInHistoryScreen = () => {
     }
   };
 
+  // Older check-ins, one page at a time as the list scrolls
+  const loadMore = async () => {
+    if (!nextCursor || isLoadingMore) {
+      return;
+    }
+    setIsLoadingMore(true);
+    try {
+      const data = await apiService.getCheckInHistory(nextCursor);
+      setHistory((current) => [...current, ...data.results]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more history:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const onRefresh = async () => {
     setIsRefreshing(true);
     await loadHistory();
@@ -120,6 +140,11 @@ const CheckInHistoryScreen = () => {
           refreshControl={
             <RefreshControl refreshing={isRefreshing} onRefresh={onRefresh} />
           }
+          onEndReached={loadMore}
+          onEndReachedThreshold={0.5}
+          ListFooterComponent={
+            isLoadingMore ? <ActivityIndicator style={styles.loadingMore} color="#2563eb" /> : null
+          }
           contentContainerStyle={styles.listContainer}
         />
       )}
@@ -132,6 +157,9 @@ const styles = StyleSheet.create({
     flex: 1,
     backgroundColor: '#f8faff',
   },
+  loadingMore: {
+    marginVertical: 16,
+  },
   loadingContainer: {
     flex: 1,
     justifyContent: 'center',
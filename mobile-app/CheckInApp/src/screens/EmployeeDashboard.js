@@ -32,6 +32,12 @@ const EmployeeDashboard = () => {
     getUserLocation();
   }, []);
 
+  useEffect(() => {
+    if (userLocation) {
+      suggestNearestLocation();
+    }
+  }, [userLocation]);
+
   const getUserLocation = async () => {
     try {
       const { status } = await Location.requestForegroundPermissionsAsync();
@@ -55,15 +61,38 @@ const EmployeeDashboard = () => {
     }
   };
 
+  // Preselect the closest location whose check-in range covers the user
+  const suggestNearestLocation = async () => {
+    try {
+      const nearby = await apiService.getNearbyLocations(
+        userLocation.latitude,
+        userLocation.longitude,
+        1
+      );
+      if (nearby.length > 0) {
+        setSelectedLocation((current) => current || nearby[0]);
+      }
+    } catch (error) {
+      console.error('Nearby locations error:', error);
+    }
+  };
+
   const loadData = async () => {
     try {
-      const [locationsData, activeCheckInData] = await Promise.all([
-        apiService.getLocations(),
-        apiService.getActiveCheckIn(),
-      ]);
+      const rejected = await apiService.syncQueuedEvents();
+      if (rejected.length > 0) {
+        Alert.alert(
+          'Offline events rejected',
+          rejected.map((result) => result.error || 'Invalid event').join('\n')
+        );
+      }
+
+      // Locations and the active check-in in one request; the profile
+      // already came with the login
+      const data = await apiService.getBootstrap(['profile']);
       
-      setLocations(locationsData);
-      setActiveCheckIn(activeCheckInData.active_checkin || null);
+      setLocations(data.locations);
+      setActiveCheckIn(data.active_checkin);
     } catch (error) {
       Alert.alert('Error', error.message);
     } finally {
@@ -96,7 +125,7 @@ const EmployeeDashboard = () => {
         userLocation.longitude
       );
       
-      Alert.alert('Success', result.message);
+      Alert.alert(result.queued ? 'Saved Offline' : 'Success', result.message);
       await loadData();
     } catch (error) {
       Alert.alert('Check-in Failed', error.message);
@@ -116,7 +145,7 @@ const EmployeeDashboard = () => {
         userLocation.longitude
       );
       
-      Alert.alert('Success', result.message);
+      Alert.alert(result.queued ? 'Saved Offline' : 'Success', result.message);
       await loadData();
       setSelectedLocation(null);
     } catch (error) {
@@ -1,8 +1,15 @@
 import axios from 'axios';
+import { offlineQueue } from './offlineQueue';
+
+const newIdempotencyKey = () =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
 
 // Replace with your Django server URL
 const BASE_URL = 'http://192.168.1.100:8000'; // Change this to your local IP
 
+// Check-in fields CheckInHistoryScreen displays
+const HISTORY_FIELDS = 'id,location_name,check_in_time,check_out_time,status,duration_formatted';
+
 class ApiService {
   constructor() {
     this.api = axios.create({
@@ -14,10 +21,13 @@ class ApiService {
     });
 
     this.authToken = null;
+    // url -> { etag, data } for endpoints that answer conditional requests
+    this.conditionalCache = new Map();
   }
 
   setAuthToken(token) {
     this.authToken = token;
+    this.conditionalCache.clear();
     if (token) {
       this.api.defaults.headers.common['Authorization'] = `Token ${token}`;
     } else {
@@ -54,15 +64,54 @@ class ApiService {
     }
   }
 
-  async getLocations() {
+  // Everything the employee dashboard needs in one request; skip lists
+  // sections to leave out (profile, locations, active_checkin)
+  async getBootstrap(skip = []) {
     try {
-      const response = await this.api.get('/api/mobile/locations/');
+      const response = await this.api.get('/api/mobile/bootstrap/', {
+        params: skip.length ? { skip: skip.join(',') } : {},
+      });
       return response.data;
+    } catch (error) {
+      throw new Error(error.response?.data?.error || 'Failed to load dashboard');
+    }
+  }
+
+  // GET that revalidates a cached copy with If-None-Match and reuses it on 304
+  async getConditional(url) {
+    const cached = this.conditionalCache.get(url);
+    const response = await this.api.get(url, {
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    });
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+    if (response.headers.etag) {
+      this.conditionalCache.set(url, { etag: response.headers.etag, data: response.data });
+    }
+    return response.data;
+  }
+
+  async getLocations() {
+    try {
+      return await this.getConditional('/api/mobile/locations/');
     } catch (error) {
       throw new Error(error.response?.data?.error || 'Failed to get locations');
     }
   }
 
+  async getNearbyLocations(latitude, longitude, k = 5) {
+    try {
+      const response = await this.api.get('/api/mobile/locations/nearby/', {
+        params: { latitude, longitude, k },
+      });
+      return response.data;
+    } catch (error) {
+      throw new Error(error.response?.data?.error || 'Failed to get nearby locations');
+    }
+  }
+
   async getActiveCheckIn() {
     try {
       const response = await this.api.get('/api/mobile/active-checkin/');
@@ -72,40 +121,104 @@ class ApiService {
     }
   }
 
-  async getCheckInHistory() {
+  // One page of history, newest first: { results, next_cursor }. Pass
+  // next_cursor back to get the page after it. Only the fields the history
+  // screen shows are requested, which also skips the employee join.
+  async getCheckInHistory(cursor = null) {
     try {
-      const response = await this.api.get('/api/mobile/checkin-history/');
+      const params = { fields: HISTORY_FIELDS };
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      const response = await this.api.get('/api/mobile/checkin-history/', { params });
       return response.data;
     } catch (error) {
       throw new Error(error.response?.data?.error || 'Failed to get check-in history');
     }
   }
 
+  // No response at all means the request never reached the server
+  isNetworkError(error) {
+    return !error.response;
+  }
+
+  // POST with an Idempotency-Key, retrying once on a timeout. The server
+  // replays its first response if the original request did get through.
+  async postIdempotent(url, data) {
+    const config = { headers: { 'Idempotency-Key': newIdempotencyKey() } };
+    try {
+      return await this.api.post(url, data, config);
+    } catch (error) {
+      if (error.code !== 'ECONNABORTED') {
+        throw error;
+      }
+      return this.api.post(url, data, config);
+    }
+  }
+
   async checkIn(locationId, latitude, longitude) {
     try {
-      const response = await this.api.post('/api/mobile/checkin/', {
+      const response = await this.postIdempotent('/api/mobile/checkin/', {
         location_id: locationId,
         latitude,
         longitude,
       });
       return response.data;
     } catch (error) {
+      if (this.isNetworkError(error)) {
+        await offlineQueue.enqueue({
+          type: 'check_in',
+          location_id: locationId,
+          latitude,
+          longitude,
+        });
+        return { queued: true, message: 'No connection. Your check-in was saved and will be sent when you are back online.' };
+      }
       throw new Error(error.response?.data?.error || 'Check-in failed');
     }
   }
 
   async checkOut(latitude, longitude) {
     try {
-      const response = await this.api.post('/api/mobile/checkout/', {
+      const response = await this.postIdempotent('/api/mobile/checkout/', {
         latitude,
         longitude,
       });
       return response.data;
     } catch (error) {
+      if (this.isNetworkError(error)) {
+        await offlineQueue.enqueue({
+          type: 'check_out',
+          latitude,
+          longitude,
+        });
+        return { queued: true, message: 'No connection. Your check-out was saved and will be sent when you are back online.' };
+      }
       throw new Error(error.response?.data?.error || 'Check-out failed');
     }
   }
 
+  // Send queued offline events in one request. Events the server answered
+  // for are removed from the queue; rejected ones are returned to the caller.
+  async syncQueuedEvents() {
+    const events = await offlineQueue.getEvents();
+    if (events.length === 0) {
+      return [];
+    }
+
+    try {
+      const response = await this.api.post('/api/mobile/checkins/sync/', { events });
+      const results = response.data.results;
+      await offlineQueue.remove(results.map((result) => result.client_id));
+      return results.filter((result) => result.status === 'rejected');
+    } catch (error) {
+      if (this.isNetworkError(error)) {
+        return [];
+      }
+      throw new Error(error.response?.data?.error || 'Failed to sync queued check-ins');
+    }
+  }
+
   // Admin APIs
   async getAdminDashboardStats() {
     try {
@@ -134,10 +247,93 @@ class ApiService {
     }
   }
 
-  async getAdminLocations() {
+  // Everything the admin dashboard needs in one request; skip lists
+  // sections to leave out (stats, checkins, employees, locations)
+  async getAdminBootstrap(skip = []) {
     try {
-      const response = await this.api.get('/api/mobile/admin/locations/');
+      const response = await this.api.get('/api/mobile/admin/bootstrap/', {
+        params: skip.length ? { skip: skip.join(',') } : {},
+      });
       return response.data;
+    } catch (error) {
+      throw new Error(error.response?.data?.error || 'Failed to load dashboard');
+    }
+  }
+
+  async getAdminSync(cursor) {
+    try {
+      const response = await this.api.get('/api/mobile/admin/sync/', {
+        params: cursor ? { since: cursor } : {},
+      });
+      return response.data;
+    } catch (error) {
+      throw new Error(error.response?.data?.error || 'Failed to sync dashboard');
+    }
+  }
+
+  // Admin live feed (Server-Sent Events) read over XMLHttpRequest, since React
+  // Native has no EventSource. Calls onEvent(type, data) for every event and
+  // reconnects after the server's retry delay. Returns a function that stops it.
+  subscribeAdminEvents(onEvent) {
+    let xhr = null;
+    let timer = null;
+    let stopped = false;
+    let retryDelay = 5000;
+
+    const connect = () => {
+      let seen = 0;
+      let buffer = '';
+      xhr = new XMLHttpRequest();
+      xhr.open('GET', `${BASE_URL}/api/mobile/admin/live/`);
+      xhr.setRequestHeader('Accept', 'text/event-stream');
+      if (this.authToken) {
+        xhr.setRequestHeader('Authorization', `Token ${this.authToken}`);
+      }
+      xhr.onprogress = () => {
+        buffer += xhr.responseText.slice(seen);
+        seen = xhr.responseText.length;
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        blocks.forEach((block) => {
+          let type = 'message';
+          const data = [];
+          block.split('\n').forEach((line) => {
+            if (line.startsWith('event:')) {
+              type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+              data.push(line.slice(5).trim());
+            } else if (line.startsWith('retry:')) {
+              retryDelay = Number(line.slice(6)) || retryDelay;
+            }
+          });
+          if (data.length > 0) {
+            onEvent(type, JSON.parse(data.join('\n')));
+          }
+        });
+        // responseText keeps everything received; start over before it grows large
+        if (seen > 1024 * 1024) {
+          xhr.abort();
+        }
+      };
+      xhr.onloadend = () => {
+        if (!stopped && xhr.status !== 403) {
+          timer = setTimeout(connect, retryDelay);
+        }
+      };
+      xhr.send();
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(timer);
+      xhr.abort();
+    };
+  }
+
+  async getAdminLocations() {
+    try {
+      return await this.getConditional('/api/mobile/admin/locations/');
     } catch (error) {
       throw new Error(error.response?.data?.error || 'Failed to get locations');
     }
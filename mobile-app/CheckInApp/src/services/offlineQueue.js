@@ -0,0 +1,41 @@
+import * as SecureStore from 'expo-secure-store';
+
+// Check-in and check-out events that could not reach the server
+const QUEUE_KEY = 'offlineCheckInQueue';
+
+const newClientId = () =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+
+export const offlineQueue = {
+  async getEvents() {
+    try {
+      const stored = await SecureStore.getItemAsync(QUEUE_KEY);
+      return stored ? JSON.parse(stored) : [];
+    } catch (error) {
+      console.error('Error reading offline queue:', error);
+      return [];
+    }
+  },
+
+  async enqueue(event) {
+    const events = await this.getEvents();
+    const queued = {
+      client_id: newClientId(),
+      timestamp: new Date().toISOString(),
+      ...event,
+    };
+    events.push(queued);
+    await SecureStore.setItemAsync(QUEUE_KEY, JSON.stringify(events));
+    return queued;
+  },
+
+  async remove(clientIds) {
+    const events = await this.getEvents();
+    const remaining = events.filter((event) => !clientIds.includes(event.client_id));
+    if (remaining.length > 0) {
+      await SecureStore.setItemAsync(QUEUE_KEY, JSON.stringify(remaining));
+    } else {
+      await SecureStore.deleteItemAsync(QUEUE_KEY);
+    }
+  },
+};